@@ -0,0 +1,109 @@
+#!/usr/bin/env mayapy
+
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+_HERE = os.path.abspath(os.path.dirname(__file__))
+_ROOT = os.path.abspath(os.path.join(_HERE, os.pardir))
+sys.path.insert(0, _ROOT)
+
+import revl
+from benchmarks.run import options
+
+
+def _noop(context, *args, **kwargs):
+    pass
+
+
+def _createCommands(size):
+    return [revl.Command(1.0 + i % 7, _noop) for i in range(size)]
+
+
+class EngineBench(unittest.TestCase):
+
+    def _benchInterpreter(self, code):
+        count = 10
+        for _ in range(count):
+            subprocess.check_call([sys.executable, '-c', code], cwd=_ROOT)
+
+    def _benchDispatch(self, command):
+        count = 100000
+        commands = [command]
+        schedule = revl.plan(commands, count, seed=1.23, draws=0)
+        revl.execute(schedule, commands)
+
+    def _benchPick(self, sampling, size):
+        count = 100000
+        commands = _createCommands(size)
+        generator = random.Random(1.23)
+        for _ in revl._pick(commands, count, generator, sampling=sampling):
+            pass
+
+    def benchPickLinear10(self):
+        self._benchPick(revl.Sampling.LINEAR, 10)
+
+    def benchPickLinear100(self):
+        self._benchPick(revl.Sampling.LINEAR, 100)
+
+    def benchPickLinear1000(self):
+        self._benchPick(revl.Sampling.LINEAR, 1000)
+
+    def benchPickBisect10(self):
+        self._benchPick(revl.Sampling.BISECT, 10)
+
+    def benchPickBisect100(self):
+        self._benchPick(revl.Sampling.BISECT, 100)
+
+    def benchPickBisect1000(self):
+        self._benchPick(revl.Sampling.BISECT, 1000)
+
+    def benchPickAlias10(self):
+        self._benchPick(revl.Sampling.ALIAS, 10)
+
+    def benchPickAlias100(self):
+        self._benchPick(revl.Sampling.ALIAS, 100)
+
+    def benchPickAlias1000(self):
+        self._benchPick(revl.Sampling.ALIAS, 1000)
+
+    def benchPickNumpy10(self):
+        self._benchPick(revl.Sampling.NUMPY, 10)
+
+    def benchPickNumpy100(self):
+        self._benchPick(revl.Sampling.NUMPY, 100)
+
+    def benchPickNumpy1000(self):
+        self._benchPick(revl.Sampling.NUMPY, 1000)
+
+    @options(repeat=1, warmup=0)
+    def benchImport1(self):
+        # Baseline to subtract from the import benchmarks.
+        self._benchInterpreter('pass')
+
+    @options(repeat=1, warmup=0)
+    def benchImport2(self):
+        self._benchInterpreter('import revl')
+
+    @options(repeat=1, warmup=0)
+    def benchImport3(self):
+        self._benchInterpreter('import revl; revl.Context()')
+
+    def benchDispatch1(self):
+        self._benchDispatch((1.0, _noop))
+
+    def benchDispatch2(self):
+        self._benchDispatch((1.0, _noop, (1, 2)))
+
+    def benchDispatch3(self):
+        self._benchDispatch((1.0, _noop, (), {'a': 1, 'b': 2}))
+
+    def benchDispatch4(self):
+        self._benchDispatch((1.0, _noop, (1, 2), {'a': 1, 'b': 2}))
+
+
+if __name__ == '__main__':
+    from benchmarks.run import run
+    run('__main__')
@@ -4,15 +4,23 @@ import os
 import sys
 import unittest
 
-import maya.standalone
-from maya import OpenMaya
-
 _HERE = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, os.path.abspath(os.path.join(_HERE, os.pardir)))
 
 import revl
+from benchmarks.run import sweep
+
+# Name of the backend to create the nodes with, as defined in 'revl.Backend'.
+# The 'FAKE' backend allows to run the benchmarks without Maya.
+_BACKEND = getattr(revl.Backend,
+                   os.environ.get('REVL_BACKEND', 'API1').upper())
+
+if _BACKEND != revl.Backend.FAKE:
+    import maya.standalone
+    maya.standalone.initialize()
 
-maya.standalone.initialize()
+revl.setDefaultBackend(_BACKEND)
+OpenMaya = revl._getBinding(_BACKEND).OpenMaya
 
 
 class MainBench(unittest.TestCase):
@@ -55,6 +63,41 @@ class MainBench(unittest.TestCase):
         ]
         revl.run(commands, count)
 
+    def benchCreatePrimitive6(self):
+        count = 5000
+        commands = [
+            (1.0, revl.createPrimitive, (), {'shareGenerator': True})
+        ]
+        revl.run(commands, count)
+
+    def benchCreatePrimitives1(self):
+        count = 50
+        commands = [
+            (1.0, revl.createPrimitives, (100,))
+        ]
+        revl.run(commands, count)
+
+    def benchCreatePrimitives2(self):
+        count = 50
+        commands = [
+            (1.0, revl.createPrimitives, (100,), {'type': revl.PrimitiveType.POLY_CUBE})
+        ]
+        revl.run(commands, count)
+
+    def benchCreateDgNode1(self):
+        count = 5000
+        commands = [
+            (1.0, revl.createDgNode, ('lambert',))
+        ]
+        revl.run(commands, count)
+
+    def benchCreateDgNodes1(self):
+        count = 50
+        commands = [
+            (1.0, revl.createDgNodes, ('lambert', 100))
+        ]
+        revl.run(commands, count)
+
     def benchCreateTransform1(self):
         count = 5000
         commands = [
@@ -76,6 +119,41 @@ class MainBench(unittest.TestCase):
         ]
         revl.run(commands, count)
 
+    def benchCreateTransforms1(self):
+        count = 50
+        commands = [
+            (1.0, revl.createTransforms, (100,))
+        ]
+        revl.run(commands, count)
+
+    def benchCreateTransforms2(self):
+        count = 50
+        commands = [
+            (1.0, revl.createTransforms, (100,), {'name': 'xform'})
+        ]
+        revl.run(commands, count)
+
+    def benchCreateTransforms3(self):
+        count = 50
+        commands = [
+            (1.0, revl.createTransforms, (100,), {'parent': True})
+        ]
+        revl.run(commands, count)
+
+    @sweep(size='count', count=(1000, 10000, 100000), parent=(False, True))
+    def benchCreateTransformSweep1(self, count, parent):
+        commands = [
+            (1.0, revl.createTransform, (), {'parent': parent})
+        ]
+        revl.run(commands, count)
+
+    @sweep(size='count', count=(1000, 10000, 100000), parent=(False, True))
+    def benchCreatePrimitiveSweep1(self, count, parent):
+        commands = [
+            (1.0, revl.createPrimitive, (), {'parent': parent})
+        ]
+        revl.run(commands, count)
+
 
 if __name__ == '__main__':
     from benchmarks.run import run
@@ -3,17 +3,28 @@
 import argparse
 import bisect
 import collections
+import cProfile
+import gc
+import itertools
+import json
+import math
 import os
+import platform
+import pstats
+import subprocess
 import sys
+import tempfile
+import threading
 import timeit
 import unittest
+from multiprocessing.pool import ThreadPool
 
 
 _clock = timeit.default_timer
 
 
 # Usage's syntax based on docopt.
-_USAGE = "%(prog)s [<name>...]"
+_USAGE = "%(prog)s [options] [<name>...]"
 _DESCRIPTION = (
     "Runs the benchmarks that have their name containing either one of the "
     "'name' arguments passed. If no 'name' argument is passed, all the "
@@ -21,6 +32,24 @@ _DESCRIPTION = (
 )
 
 
+# Multiple of the interquartile range beyond which a sample is an outlier.
+_OUTLIER_FACTOR = 1.5
+
+# Version of the format of the JSON results.
+_RESULTS_VERSION = 1
+
+
+# Enumerator for the isolation modes.
+_ISOLATE_BENCH = 'bench'
+_ISOLATE_REPETITION = 'repetition'
+
+
+# Enumerator for the profilers.
+_PROFILER_DETERMINISTIC = 'deterministic'
+_PROFILER_SAMPLING = 'sampling'
+_PROFILER_ALL = 'all'
+
+
 # Enumerator for the internal messages.
 _MESSAGE_SUITE_SETUP = 0
 _MESSAGE_SUITE_TEARDOWN = 1
@@ -34,6 +63,78 @@ _Message = collections.namedtuple(
 )
 
 
+_Point = collections.namedtuple(
+    '_Point', (
+        'name',
+        'label',
+        'kwargs',
+        'size',
+    )
+)
+
+
+_Task = collections.namedtuple(
+    '_Task', (
+        'name',
+        'repeat',
+        'warmup',
+        'profile',
+    )
+)
+
+
+_Comparison = collections.namedtuple(
+    '_Comparison', (
+        'name',
+        'baseline',
+        'current',
+        'change',
+        'pValue',
+        'regressed',
+        'conclusive',
+    )
+)
+
+
+_Stats = collections.namedtuple(
+    '_Stats', (
+        'min',
+        'median',
+        'mean',
+        'stddev',
+        'iqr',
+        'outliers',
+    )
+)
+
+
+def options(**kwargs):
+    """Override the options of the runner for a benchmark.
+
+    The options supported are 'repeat' and 'warmup'.
+    """
+    def decorator(function):
+        function.benchOptions = kwargs
+        return function
+
+    return decorator
+
+
+def sweep(size=None, **kwargs):
+    """Run a benchmark for each combination of parameter values.
+
+    Each keyword argument defines a list of values to pass to the benchmark
+    as the argument of the same name. The argument named by 'size', if any,
+    is used to report the cost per unit and to fit the exponent 'k' of the
+    scaling law 'time = c * size ** k'.
+    """
+    def decorator(function):
+        function.benchSweep = (size, kwargs)
+        return function
+
+    return decorator
+
+
 class DummyResult(object):
 
     def wasSuccessful(self):
@@ -44,9 +145,86 @@ class BenchLoader(unittest.TestLoader):
     testMethodPrefix = 'bench'
 
 
+class _StackSampler(object):
+
+    # Periodically records the call stack of the thread that started the
+    # sampling, from a separate thread, as in a statistical profiler.
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._threadId = None
+        self._root = None
+        self._ignoredCodes = (self.start.__func__.__code__,
+                              self.stop.__func__.__code__)
+        self._switchInterval = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        # Frames from the caller and below are excluded from the stacks.
+        self._threadId = threading.current_thread().ident
+        self._root = sys._getframe(1)
+        if hasattr(sys, 'setswitchinterval'):
+            # Allow the sampling thread to acquire the GIL at least as
+            # often as it needs to.
+            self._switchInterval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switchInterval, self.interval))
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self._root = None
+        if self._switchInterval is not None:
+            sys.setswitchinterval(self._switchInterval)
+            self._switchInterval = None
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._threadId)
+            outer = None
+            stack = []
+            while frame is not None and frame is not self._root:
+                stack.append(_formatCode(frame.f_code))
+                outer, frame = frame, frame.f_back
+
+            # Discard the samples taken while starting or stopping.
+            if outer is not None and outer.f_code not in self._ignoredCodes:
+                self.counts[';'.join(reversed(stack))] += 1
+
+            del frame, outer
+
+
 class BenchRunner(object):
 
+    def __init__(self, repeat=1, warmup=0, disableGc=False, isolate=None,
+                 jobs=1, command=None, ignoreOptions=False, names=None,
+                 profile=None, profiler=_PROFILER_ALL, interval=0.001,
+                 top=10):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.disableGc = disableGc
+        self.isolate = isolate
+        self.jobs = jobs
+        self.command = command
+        self.ignoreOptions = ignoreOptions
+        self.names = names
+        self.profile = profile
+        self.profiler = profiler
+        self.interval = interval
+        self.top = top
+        self.results = collections.OrderedDict()
+
     def run(self, bench):
+        if self.isolate is not None:
+            return self._runIsolated(bench)
+
         stack = collections.deque((bench,))
         while stack:
             obj = stack.popleft()
@@ -75,36 +253,551 @@ class BenchRunner(object):
                     stack.append(_Message(type=_MESSAGE_SUITE_TEARDOWN,
                                           value=cls))
             else:
-                function = getattr(obj, _getBenchName(obj))
+                points = [point for point in _getPoints(obj)
+                          if self.names is None or point.name in self.names]
+                for point in points:
+                    samples = self._runBench(obj, point.kwargs)
+                    self.results[point.name] = samples
+                    _printSamples(obj, samples, point)
+                    if self.profile is not None:
+                        self._profileBench(obj, point)
+                        self._printProfiles(obj, point)
+
+                _printFits(obj, points, self.results)
 
-                obj.setUp()
-                start = _clock()
-                function()
-                elapsed = _clock() - start
-                obj.tearDown()
+        return DummyResult()
 
-                elapsed, unit = _pickTimeUnit(elapsed)
-                print("%s (%s.%s) ... %.3f %s"
-                      % (_getBenchName(obj), type(obj).__module__,
-                         type(obj).__name__, elapsed, unit))
+    def _runIsolated(self, bench):
+        # Each task runs in a new interpreter, either for all the repetitions
+        # of a benchmark or for a single one.
+        benchs = _flattenBenchs(bench)
+        tasks = []
+        for obj in benchs:
+            repeat, warmup = self._getOptions(obj)
+            if not self._hasOption(obj, 'warmup'):
+                # The first run in a new interpreter also pays for one-off
+                # costs that _prime() can't anticipate, such as filling the
+                # caches.
+                warmup = max(warmup, 1)
+
+            profile = self.profile is not None
+            for point in _getPoints(obj):
+                if self.isolate == _ISOLATE_REPETITION:
+                    # Only the first task of a benchmark profiles it.
+                    for i in range(repeat):
+                        tasks.append(_Task(name=point.name, repeat=1,
+                                           warmup=warmup,
+                                           profile=profile and i == 0))
+                else:
+                    tasks.append(_Task(name=point.name, repeat=repeat,
+                                       warmup=warmup, profile=profile))
+
+        pool = ThreadPool(max(self.jobs, 1))
+        try:
+            outputs = pool.map(self._runTask, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        results = collections.OrderedDict((task.name, [])
+                                          for task in tasks)
+        for task, samples in zip(tasks, outputs):
+            if samples is None:
+                results[task.name] = None
+            elif results[task.name] is not None:
+                results[task.name].extend(samples)
+
+        for obj in benchs:
+            points = _getPoints(obj)
+            for point in points:
+                samples = results[point.name]
+                if samples:
+                    self.results[point.name] = samples
+                    _printSamples(obj, samples, point)
+                    if self.profile is not None:
+                        self._printProfiles(obj, point)
+                else:
+                    print("%s%s (%s.%s) ... FAILED"
+                          % (_getBenchName(obj), point.label,
+                             type(obj).__module__, type(obj).__name__))
+
+            _printFits(obj, points, self.results)
 
         return DummyResult()
 
+    def _runTask(self, task):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        try:
+            command = list(self.command) + [
+                '--worker-output', path,
+                '--repeat', str(task.repeat),
+                '--warmup', str(task.warmup),
+            ]
+            if self.disableGc:
+                command.append('--disable-gc')
+
+            if task.profile:
+                command.extend(('--profile', self.profile,
+                                '--profiler', self.profiler,
+                                '--interval', repr(self.interval)))
+
+            command.extend(('--', task.name))
+            process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT)
+            output = process.communicate()[0]
+            if process.returncode != 0:
+                sys.stderr.write(output.decode('utf-8', 'replace'))
+                return None
+
+            return _readResults(path).get(task.name)
+        finally:
+            os.remove(path)
+
+    def _runBench(self, bench, kwargs):
+        function = getattr(bench, _getBenchName(bench))
+        repeat, warmup = self._getOptions(bench)
+        for _ in range(warmup):
+            bench.setUp()
+            function(**kwargs)
+            bench.tearDown()
+
+        samples = []
+        for _ in range(repeat):
+            bench.setUp()
+            samples.append(self._time(function, kwargs))
+            bench.tearDown()
+
+        return samples
+
+    def _profileBench(self, bench, point):
+        # The profiling runs happen after the timed ones and are never part
+        # of the samples reported.
+        function = getattr(bench, _getBenchName(bench))
+        if not os.path.isdir(self.profile):
+            os.makedirs(self.profile)
+
+        if self.profiler in (_PROFILER_DETERMINISTIC, _PROFILER_ALL):
+            profiler = cProfile.Profile()
+            bench.setUp()
+            try:
+                profiler.runcall(function, **point.kwargs)
+            finally:
+                bench.tearDown()
+
+            profiler.dump_stats(_getProfilePath(self.profile, point,
+                                                '.pstats'))
+
+        if self.profiler in (_PROFILER_SAMPLING, _PROFILER_ALL):
+            sampler = _StackSampler(self.interval)
+            bench.setUp()
+            try:
+                sampler.start()
+                try:
+                    function(**point.kwargs)
+                finally:
+                    sampler.stop()
+            finally:
+                bench.tearDown()
+
+            _writeCollapsedStacks(
+                _getProfilePath(self.profile, point, '.folded'),
+                sampler.counts)
+
+    def _printProfiles(self, bench, point):
+        path = _getProfilePath(self.profile, point, '.pstats')
+        if os.path.exists(path):
+            _printHotSpots(bench, point, path, _readProfileStats(path),
+                           self.top)
+
+        path = _getProfilePath(self.profile, point, '.folded')
+        if os.path.exists(path):
+            _printHotSpots(bench, point, path, _readCollapsedStacks(path),
+                           self.top)
+
+    def _getOptions(self, bench):
+        if self.ignoreOptions:
+            return (self.repeat, self.warmup)
+
+        function = getattr(bench, _getBenchName(bench))
+        options = getattr(function, 'benchOptions', {})
+        return (options.get('repeat', self.repeat),
+                options.get('warmup', self.warmup))
+
+    def _hasOption(self, bench, name):
+        if self.ignoreOptions:
+            return False
+
+        function = getattr(bench, _getBenchName(bench))
+        return name in getattr(function, 'benchOptions', {})
+
+    def _time(self, function, kwargs):
+        gcEnabled = gc.isenabled()
+        if self.disableGc:
+            gc.collect()
+            gc.disable()
+
+        try:
+            start = _clock()
+            function(**kwargs)
+            return _clock() - start
+        finally:
+            if gcEnabled:
+                gc.enable()
+
+
+def _printSamples(bench, samples, point):
+    text = _formatSamples(samples)
+    if point.size is not None and point.kwargs[point.size] > 0:
+        median = _getPercentile(sorted(samples), 0.5)
+        text += (', %.3f %s per %s'
+                 % (_pickTimeUnit(median / point.kwargs[point.size])
+                    + (point.size,)))
+
+    print("%s%s (%s.%s) ... %s"
+          % (_getBenchName(bench), point.label, type(bench).__module__,
+             type(bench).__name__, text))
+
+
+def _printHotSpots(bench, point, path, hotSpots, top):
+    # Each hot spot is a tuple '(label, self time, formatted self time)'.
+    total = sum(hotSpot[1] for hotSpot in hotSpots)
+    print("%s%s (%s.%s) ... profile written to '%s'"
+          % (_getBenchName(bench), point.label, type(bench).__module__,
+             type(bench).__name__, path))
+    hotSpots = sorted(hotSpots, key=lambda hotSpot: hotSpot[1],
+                      reverse=True)
+    for label, value, text in hotSpots[:top]:
+        ratio = float(value) / total if total > 0 else 0.0
+        print("    %5.1f%% %14s  %s" % (100.0 * ratio, text, label))
+
+
+def _readProfileStats(path):
+    stats = pstats.Stats(path)
+    out = []
+    for (filename, line, name), values in stats.stats.items():
+        out.append((_formatLocation(name, filename, line), values[2],
+                    '%.3f %s' % _pickTimeUnit(values[2])))
+
+    return out
+
+
+def _writeCollapsedStacks(path, counts):
+    # Format expected by the 'flamegraph.pl' script and compatible tools.
+    with open(path, 'w') as f:
+        for stack, count in sorted(counts.items()):
+            f.write('%s %d\n' % (stack, count))
+
+
+def _readCollapsedStacks(path):
+    counts = collections.Counter()
+    with open(path, 'r') as f:
+        for line in f:
+            stack, count = line.rstrip('\n').rsplit(' ', 1)
+            counts[stack.rsplit(';', 1)[-1]] += int(count)
+
+    return [(label, count, '%d sample(s)' % (count,))
+            for label, count in counts.items()]
+
+
+def _getProfilePath(directory, point, extension):
+    return os.path.join(directory, point.name + extension)
+
+
+def _formatCode(code):
+    return _formatLocation(code.co_name, code.co_filename,
+                           code.co_firstlineno)
+
+
+def _formatLocation(name, filename, line):
+    # The semicolon is reserved as separator in the collapsed stacks.
+    return ('%s (%s:%d)'
+            % (name, os.path.basename(filename), line)).replace(';', ',')
+
+
+def _printFits(bench, points, results):
+    # Fit the scaling exponent of each group of points only differing in
+    # their size, with a least squares regression in log-log space.
+    groups = collections.OrderedDict()
+    for point in points:
+        if point.size is None or point.name not in results:
+            continue
+
+        size = point.kwargs[point.size]
+        if size <= 0:
+            continue
+
+        others = tuple((key, value)
+                       for key, value in sorted(point.kwargs.items())
+                       if key != point.size)
+        median = _getPercentile(sorted(results[point.name]), 0.5)
+        groups.setdefault(others, []).append((size, median))
+
+    for others, values in groups.items():
+        exponent = _fitExponent(values)
+        if exponent is None:
+            continue
+
+        print("%s%s (%s.%s) ... scaling exponent %.3f over %s"
+              % (_getBenchName(bench), _formatLabel(others),
+                 type(bench).__module__, type(bench).__name__, exponent,
+                 points[0].size))
+
+
+def _fitExponent(values):
+    values = [(math.log(size), math.log(time)) for size, time in values
+              if time > 0.0]
+    if len(set(x for x, _ in values)) < 2:
+        return None
+
+    meanX = sum(x for x, _ in values) / len(values)
+    meanY = sum(y for _, y in values) / len(values)
+    covariance = sum((x - meanX) * (y - meanY) for x, y in values)
+    variance = sum((x - meanX) ** 2 for x, _ in values)
+    return covariance / variance
+
+
+def _getPoints(bench):
+    name = _getBenchFullName(bench)
+    function = getattr(bench, _getBenchName(bench))
+    definition = getattr(function, 'benchSweep', None)
+    if definition is None:
+        return [_Point(name=name, label='', kwargs={}, size=None)]
+
+    size, kwargs = definition
+    keys = sorted(kwargs)
+    out = []
+    for values in itertools.product(*(kwargs[key] for key in keys)):
+        items = tuple(zip(keys, values))
+        label = _formatLabel(items)
+        out.append(_Point(name=name + label, label=label, kwargs=dict(items),
+                          size=size))
+
+    return out
+
+
+def _formatLabel(items):
+    if not items:
+        return ''
+
+    return '[%s]' % (','.join('%s=%r' % item for item in items),)
+
+
+def _flattenBenchs(bench):
+    out = []
+    stack = [bench]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, unittest.TestSuite):
+            stack.extend(reversed(list(obj)))
+        else:
+            out.append(obj)
+
+    return out
+
 
 def _pickTimeUnit(value):
+    if value <= 1e-12:
+        return (0.0, 'ns')
+
+    scale, unit = _getTimeScale(value)
+    return (value / scale, unit)
+
+
+def _getTimeScale(value):
     bounds = (1e-9, 1e-6, 1e-3)
     units = 'num'
     if value >= 1.0:
-        out = (value, 's')
-    elif value <= bounds[0] * 1e-3:
-        out = (0.0, '%ss' % (units[0],))
+        return (1.0, 's')
+
+    i = max(0, bisect.bisect(bounds, value) - 1)
+    return (bounds[i], '%ss' % (units[i],))
+
+
+def _formatSamples(samples):
+    if len(samples) == 1:
+        return '%.3f %s' % _pickTimeUnit(samples[0])
+
+    stats = _computeStats(samples)
+    scale, unit = _getTimeScale(stats.median)
+    return ('min %.3f %s, median %.3f %s, mean %.3f %s, stddev %.3f %s, '
+            'iqr %.3f %s, %d outlier(s) in %d runs'
+            % (stats.min / scale, unit, stats.median / scale, unit,
+               stats.mean / scale, unit, stats.stddev / scale, unit,
+               stats.iqr / scale, unit, stats.outliers, len(samples)))
+
+
+def _computeStats(samples):
+    samples = sorted(samples)
+    count = len(samples)
+    mean = sum(samples) / count
+    if count > 1:
+        variance = sum((x - mean) ** 2 for x in samples) / (count - 1)
     else:
-        i = max(0, bisect.bisect(bounds, value) - 1)
-        out = (value / bounds[i], '%ss' % (units[i],))
+        variance = 0.0
+
+    lower = _getPercentile(samples, 0.25)
+    upper = _getPercentile(samples, 0.75)
+    iqr = upper - lower
+    low = lower - _OUTLIER_FACTOR * iqr
+    high = upper + _OUTLIER_FACTOR * iqr
+    outliers = sum(1 for x in samples if x < low or x > high)
+    return _Stats(min=samples[0], median=_getPercentile(samples, 0.5),
+                  mean=mean, stddev=math.sqrt(variance), iqr=iqr,
+                  outliers=outliers)
+
+
+def _getPercentile(samples, fraction):
+    # Linear interpolation between the closest ranks of the sorted samples.
+    position = (len(samples) - 1) * fraction
+    i = int(position)
+    if i + 1 >= len(samples):
+        return samples[-1]
+
+    return samples[i] + (samples[i + 1] - samples[i]) * (position - i)
+
+
+def _prime():
+    # Pay for the one-off costs of a new interpreter before timing anything,
+    # such as the modules that revl imports on their first use.
+    revl = sys.modules.get('revl')
+    if revl is None:
+        return
+
+    revl._getNumpy()
+    revl._getBinding(revl.getDefaultBackend())
+
+
+def _getEnvironment():
+    environment = collections.OrderedDict((
+        ('python', platform.python_version()),
+        ('implementation', platform.python_implementation()),
+        ('platform', platform.platform()),
+        ('machine', platform.machine()),
+        ('revl', None),
+        ('maya', None),
+    ))
+
+    try:
+        import revl
+        environment['revl'] = revl.__version__
+    except ImportError:
+        pass
+
+    if 'maya' in sys.modules:
+        try:
+            import maya.cmds
+            environment['maya'] = maya.cmds.about(version=True)
+        except Exception:
+            pass
+
+    return environment
+
+
+def _writeResults(path, results):
+    data = collections.OrderedDict((
+        ('version', _RESULTS_VERSION),
+        ('environment', _getEnvironment()),
+        ('benchmarks', [collections.OrderedDict((('name', name),
+                                                 ('samples', samples)))
+                        for name, samples in results.items()]),
+    ))
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def _readResults(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    return collections.OrderedDict((bench['name'], bench['samples'])
+                                   for bench in data['benchmarks'])
+
+
+def _compareResults(baseline, results, threshold, alpha):
+    out = []
+    for name, samples in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+
+        before = _getPercentile(sorted(reference), 0.5)
+        after = _getPercentile(sorted(samples), 0.5)
+        change = after / before - 1.0 if before > 0.0 else 0.0
+        pValue = _testMannWhitney(samples, reference)
+        regressed = change > threshold and pValue < alpha
+        conclusive = (_getMinPValue(len(samples), len(reference)) < alpha)
+        out.append(_Comparison(name=name, baseline=before, current=after,
+                               change=change, pValue=pValue,
+                               regressed=regressed, conclusive=conclusive))
 
     return out
 
 
+def _printComparisons(comparisons):
+    for comparison in comparisons:
+        scale, unit = _getTimeScale(comparison.baseline)
+        print("%s ... %.3f %s -> %.3f %s (%+.1f%%, p=%.3g)%s"
+              % (comparison.name, comparison.baseline / scale, unit,
+                 comparison.current / scale, unit, comparison.change * 100.0,
+                 comparison.pValue,
+                 ' REGRESSION' if comparison.regressed
+                 else '' if comparison.conclusive else ' INCONCLUSIVE'))
+
+
+def _getMinPValue(n1, n2):
+    # Smallest p-value that the test can return for the given sample sizes,
+    # reached when all the samples are greater than the reference ones.
+    return _testMannWhitney(range(n2, n1 + n2), range(n2))
+
+
+def _getMinSampleCount(alpha):
+    # Smallest number of samples on each side allowing a significant result.
+    count = 1
+    while _getMinPValue(count, count) >= alpha:
+        count += 1
+
+    return count
+
+
+def _testMannWhitney(samples, reference):
+    # One-sided Mann-Whitney U test of the samples being greater than the
+    # reference ones, using the normal approximation with a correction for
+    # the ties. Returns the p-value.
+    n1 = len(samples)
+    n2 = len(reference)
+    values = sorted([(x, 0) for x in samples] + [(x, 1) for x in reference])
+
+    ranks = [0.0] * len(values)
+    ties = 0.0
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+
+        rank = (i + j) / 2.0 + 1.0
+        for k in range(i, j + 1):
+            ranks[k] = rank
+
+        size = j - i + 1
+        ties += size ** 3 - size
+        i = j + 1
+
+    rankSum = sum(rank for rank, (_, group) in zip(ranks, values)
+                  if group == 0)
+    u = rankSum - n1 * (n1 + 1) / 2.0
+    mean = n1 * n2 / 2.0
+    n = n1 + n2
+    variance = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0.0:
+        return 1.0
+
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
 def _findBenchs(path, selectors=None):
     if selectors is None:
         def filter(bench):
@@ -151,11 +844,102 @@ def run(startPath):
     parser = argparse.ArgumentParser(usage=_USAGE, description=_DESCRIPTION)
     parser.add_argument('name', nargs='*',
                         help='partial benchmark names to search')
+    parser.add_argument('--repeat', type=int, default=1, metavar='N',
+                        help='number of timed runs for each benchmark')
+    parser.add_argument('--warmup', type=int, default=0, metavar='N',
+                        help='number of untimed runs before the timed ones')
+    parser.add_argument('--disable-gc', action='store_true',
+                        help='disable the garbage collector while timing')
+    parser.add_argument('--json', metavar='PATH',
+                        help='file to write the results to')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='results file to compare the results against')
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        metavar='RATIO',
+                        help='relative slowdown of the median beyond which a '
+                             'significant difference is a regression')
+    parser.add_argument('--alpha', type=float, default=0.01,
+                        help='significance level of the statistical test')
+    parser.add_argument('--isolate',
+                        choices=(_ISOLATE_BENCH, _ISOLATE_REPETITION),
+                        help='run each benchmark, or each repetition, in a '
+                             'new process')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help='number of processes to run in parallel when '
+                             'isolating the benchmarks')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='profile each benchmark once more, after the '
+                             'timed runs, and write the profiles to the '
+                             'given directory')
+    parser.add_argument('--profiler',
+                        choices=(_PROFILER_DETERMINISTIC, _PROFILER_SAMPLING,
+                                 _PROFILER_ALL),
+                        default=_PROFILER_ALL,
+                        help='profiler to use, either cProfile, a sampling '
+                             'profiler, or both in separate runs')
+    parser.add_argument('--interval', type=float, default=0.001,
+                        metavar='SECONDS',
+                        help='time between two samples of the sampling '
+                             'profiler')
+    parser.add_argument('--top', type=int, default=10, metavar='N',
+                        help='number of hot functions to print per profile')
+    parser.add_argument('--worker-output', metavar='PATH',
+                        help=argparse.SUPPRESS)
     args = parser.parse_args()
+
+    if args.worker_output is not None:
+        # Run in a worker process spawned by an isolating runner.
+        names = set(args.name)
+        benchs = [bench for bench in _findBenchs(startPath)
+                  if any(point.name in names for point in _getPoints(bench))]
+        _prime()
+        runner = BenchRunner(repeat=args.repeat, warmup=args.warmup,
+                             disableGc=args.disable_gc, ignoreOptions=True,
+                             names=names, profile=args.profile,
+                             profiler=args.profiler, interval=args.interval,
+                             top=0)
+        runner.run(BenchLoader().suiteClass(benchs))
+        _writeResults(args.worker_output, runner.results)
+        return
+
     selectors = args.name if args.name else None
     benchs = _findBenchs(startPath, selectors)
+    _prime()
     suite = BenchLoader().suiteClass(benchs)
-    BenchRunner().run(suite)
+    runner = BenchRunner(repeat=args.repeat, warmup=args.warmup,
+                         disableGc=args.disable_gc, isolate=args.isolate,
+                         jobs=args.jobs,
+                         command=[sys.executable,
+                                  os.path.abspath(sys.argv[0])],
+                         profile=args.profile, profiler=args.profiler,
+                         interval=args.interval, top=args.top)
+    runner.run(suite)
+
+    if args.json is not None:
+        _writeResults(args.json, runner.results)
+
+    if args.baseline is not None:
+        comparisons = _compareResults(_readResults(args.baseline),
+                                      runner.results, args.threshold,
+                                      args.alpha)
+        _printComparisons(comparisons)
+        inconclusive = sum(1 for comparison in comparisons
+                           if not comparison.conclusive)
+        if inconclusive:
+            # No difference can be significant with too few samples, which
+            # would let any regression through.
+            message = (
+                "%d benchmark(s) have too few samples to detect a "
+                "regression at alpha=%g, at least %d runs on each side are "
+                "needed" % (inconclusive, args.alpha,
+                            _getMinSampleCount(args.alpha)))
+            if inconclusive == len(comparisons):
+                sys.exit("error: %s" % (message,))
+
+            sys.stderr.write("warning: %s\n" % (message,))
+
+        if any(comparison.regressed for comparison in comparisons):
+            sys.exit(1)
 
 
 if __name__ == "__main__":
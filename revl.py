@@ -6,9 +6,15 @@
 
 """Helps to benchmark code for Autodesk Maya."""
 
-__all__ = ['NULL_OBJ', 'Context', 'Command', 'Primitive', 'PrimitiveType',
-           'validate', 'run', 'pickTransform', 'createDagNode', 'createDgNode',
-           'createPrimitive', 'createTransform', 'unparent']
+__all__ = ['NULL_OBJ', 'Backend', 'Context', 'NodeRegistry', 'Hierarchy',
+           'HierarchyPolicy', 'Command', 'Hook', 'Primitive', 'PrimitiveType',
+           'Sampling', 'Schedule', 'Summary', 'Stats', 'CommandStats',
+           'SceneCache',
+           'getDefaultBackend', 'setDefaultBackend', 'validate', 'run',
+           'plan', 'execute', 'pickTransform', 'pickNode', 'createDagNode',
+           'createDgNode', 'createDgNodes', 'createPrimitive',
+           'createPrimitives', 'createTransform', 'createTransforms',
+           'unparent', 'reparent']
 
 __title__ = 'revl'
 __version__ = '0.2.0'
@@ -18,12 +24,20 @@ __author__ = "Christopher Crouzet"
 __contact__ = 'christopher.crouzet@gmail.com'
 __license__ = "MIT"
 
+import array
+import bisect
 import collections
+import functools
+import hashlib
+import importlib
+import itertools
 import numbers
+import os
+import pickle
 import random
 import sys
-
-from maya import OpenMaya
+import timeit
+import types
 
 
 if sys.version_info[0] == 2:
@@ -33,6 +47,8 @@ if sys.version_info[0] == 2:
         return d.iteritems(**kwargs)
 
     _range = xrange
+    _CLASS_TYPES = (type, types.ClassType)
+    _STRING_TYPES = (basestring,)
 else:
     _BUILTIN_MODULE = 'builtins'
 
@@ -40,12 +56,188 @@ else:
         return iter(d.items(**kwargs))
 
     _range = range
+    _CLASS_TYPES = (type,)
+    _STRING_TYPES = (str,)
 
+_FUNCTION_TYPES = (types.BuiltinFunctionType, types.FunctionType,
+                   types.MethodType)
 _SEQUENCE_TYPES = (list, tuple)
 
+_clock = timeit.default_timer
+
+# Number of commands to run between two checks of the limits of a run.
+_BATCH_SIZE = 1024
+
+_UNSET = object()
+
+
+class Backend(object):
+    """Enumerator for the Maya Python APIs that the nodes can be created with.
+
+    This is used as a parameter for the :class:`Context` class and for the
+    :func:`setDefaultBackend` function.
+
+    Attributes
+    ----------
+    API1
+        Maya Python API 1.0, that is the ``maya.OpenMaya`` module.
+    API2
+        Maya Python API 2.0, that is the ``maya.api.OpenMaya`` module.
+    FAKE
+        In-memory stand-in for the subset of the Maya Python API used by revl.
+        It does not require Maya and is cheap enough to measure the overhead
+        of revl itself. Its scene is reset by calling the function
+        ``MFileIO.newFile()`` from its module.
+    """
+
+    API1 = 0
+    API2 = 1
+    FAKE = 2
+
+
+_Binding = collections.namedtuple(
+    '_Binding', (
+        'OpenMaya',
+        'nullObj',
+        'primitiveAttributes',
+    ))
+
+
+_BACKEND_LOADERS = {
+    Backend.API1: functools.partial(importlib.import_module, 'maya.OpenMaya'),
+    Backend.API2: functools.partial(importlib.import_module,
+                                    'maya.api.OpenMaya'),
+    Backend.FAKE: lambda: _FakeOpenMaya,
+}
+
+_BINDINGS = {}
+
+_defaultBackend = Backend.API1
+
+
+def _getBinding(backend):
+    """Retrieve the objects bound to a backend.
+
+    The backend's module is loaded on the first call.
+
+    Parameters
+    ----------
+    backend : int
+        Backend.
+
+    Returns
+    -------
+    revl._Binding
+        The backend's module, its null object, and a cache for the attributes
+        of the primitives.
+    """
+    binding = _BINDINGS.get(backend)
+    if binding is None:
+        module = _BACKEND_LOADERS[backend]()
+        binding = _Binding(OpenMaya=module, nullObj=module.MObject.kNullObj,
+                           primitiveAttributes={})
+        _BINDINGS[backend] = binding
+
+    return binding
+
+
+# The constant ``NULL_OBJ``, as well as the names exported by the module
+# since they include it, are only computed when first accessed to avoid
+# importing Maya for nothing. Whether they are available then depends on
+# Maya being available.
+_EXPORTS = __all__
+del __all__
 
-#: Constant denoting an invalid object.
-NULL_OBJ = OpenMaya.MObject().kNullObj
+
+def __getattr__(name):
+    """Compute a module attribute on access.
+
+    Parameters
+    ----------
+    name : str
+        Name of the attribute.
+
+    Returns
+    -------
+    object
+        The value of the attribute.
+
+    Raises
+    ------
+    AttributeError
+        The attribute doesn't exist, or requires Maya but it is not
+        available.
+    """
+    if name == 'NULL_OBJ':
+        try:
+            return _getBinding(Backend.API1).nullObj
+        except ImportError:
+            pass
+    elif name == '__all__':
+        try:
+            _getBinding(Backend.API1)
+        except ImportError:
+            return [export for export in _EXPORTS if export != 'NULL_OBJ']
+
+        return list(_EXPORTS)
+
+    raise AttributeError(
+        "module '%s' has no attribute '%s'" % (__name__, name))
+
+
+if sys.version_info[:2] < (3, 7):
+    class _Module(types.ModuleType):
+        """Module proxy.
+
+        Module-level ``__getattr__()`` functions are only supported from
+        Python 3.7 onwards, so the module is replaced with this proxy that
+        forwards the attributes to it while calling its ``__getattr__()``
+        function for the missing ones.
+        """
+
+        def __init__(self, module):
+            super(_Module, self).__init__(module.__name__, module.__doc__)
+            self.__dict__['_module'] = module
+
+        def __getattr__(self, name):
+            try:
+                return getattr(self._module, name)
+            except AttributeError:
+                return __getattr__(name)
+
+        def __setattr__(self, name, value):
+            setattr(self._module, name, value)
+
+        def __delattr__(self, name):
+            delattr(self._module, name)
+
+        def __dir__(self):
+            return dir(self._module)
+
+    sys.modules[__name__] = _Module(sys.modules[__name__])
+
+
+_numpy = _UNSET
+
+
+def _getNumpy():
+    """Retrieve the NumPy module.
+
+    The module is imported on the first call.
+
+    Returns
+    -------
+    module
+        The NumPy module or ``None`` if it is not available.
+    """
+    global _numpy
+    if _numpy is _UNSET:
+        try:
+            _numpy = importlib.import_module('numpy')
+        except ImportError:
+            _numpy = None
+
+    return _numpy
 
 
 class Context(object):
@@ -53,35 +245,809 @@ class Context(object):
 
     Each command function needs to define this context as first parameter.
 
+    The Maya objects handled by the context, such as the modifiers and the
+    nodes, are defined by the Maya Python API of its backend. When no object
+    is found, the command functions return the null object of that backend,
+    which is :const:`NULL_OBJ` for the Maya Python API 1.0.
+
     Attributes
     ----------
+    backend : int
+        Backend. Available values are enumerated in the :class:`Backend`
+        class.
     dg : maya.OpenMaya.MDGModifier
         DG modifier.
     dag : maya.OpenMaya.MDagModifier
         DAG modifier.
     transforms : list of maya.OpenMaya.MObject
         Transform nodes. Provides data for the :func:`pickTransform` function.
+    trackNodes : bool
+        ``True`` to fill the attributes :attr:`nodes` and :attr:`hierarchy`
+        while creating the nodes, as required by the :func:`pickNode` and
+        :func:`reparent` functions, and by the hierarchy policies. This
+        tracking is disabled by default to spare its cost when not needed.
+    nodes : revl.NodeRegistry
+        Nodes created by the command functions of this module, grouped by
+        type, if tracked. Provides data for the :func:`pickNode` function.
+    hierarchy : revl.Hierarchy
+        Parent-child relationships between the transform nodes created by
+        the command functions of this module, if tracked. Provides data for
+        the :func:`reparent` function and for the hierarchy policies.
+    generators : dict
+        Generator nodes shared by the primitives created with the parameter
+        ``shareGenerator`` of the :func:`createPrimitive` function, indexed
+        by primitive type.
+    random : random.Random
+        Pseudo-random number generator that the command functions draw from,
+        seeded by :func:`run`. Any other object providing the methods
+        ``seed()`` and ``random()``, with the latter returning a float in the
+        range [0.0, 1.0), can be used in its place.
+    stats : revl.Stats
+        Statistics gathered while running the commands, if the instrumentation
+        was requested, or ``None`` otherwise.
+    hooks : list of revl.Hook
+        Observers notified while running the commands and while applying the
+        operations of the modifiers.
+    nodeCount : int
+        Number of nodes created by the command functions of this module.
+        Custom command functions creating nodes are expected to increment it
+        as well, for their nodes to count towards the ``untilNodes`` limit of
+        the :func:`run` function.
+    summary : revl.Summary
+        Outcome of the last run, or ``None`` if no run was completed yet.
     """
 
-    def __init__(self, **kwargs):
+    def __init__(self, backend=None, trackNodes=False, **kwargs):
         """Constructor.
 
         Parameters
         ----------
+        backend : int
+            Backend. Available values are enumerated in the :class:`Backend`
+            class. If ``None``, the default backend is used.
+        trackNodes : bool
+            ``True`` to track the nodes created in the attributes
+            :attr:`nodes` and :attr:`hierarchy`.
         kwargs
             Keyword arguments to define additional attributes.
         """
-        self.dg = OpenMaya.MDGModifier()
-        self.dag = OpenMaya.MDagModifier()
+        self.backend = _defaultBackend if backend is None else backend
+        self._binding = _getBinding(self.backend)
+        self.dg = self._binding.OpenMaya.MDGModifier()
+        self.dag = self._binding.OpenMaya.MDagModifier()
         self.transforms = []
+        self.trackNodes = trackNodes
+        self.nodes = NodeRegistry()
+        self.hierarchy = Hierarchy()
+        self.generators = {}
+        self.random = random.Random()
+        self.stats = None
+        self.hooks = []
+        self.nodeCount = 0
+        self.summary = None
         self.__dict__.update(kwargs)
 
+    def flush(self):
+        """Apply the pending operations and start over with new modifiers.
+
+        The DAG modifier is applied before the DG one, as done by the
+        function :func:`run`.
+        """
+        _doIt(self)
+        self.dag = self._binding.OpenMaya.MDagModifier()
+        self.dg = self._binding.OpenMaya.MDGModifier()
+
     def __repr__(self):
         values = ', '.join(['%s=%r' % (k, v)
-                            for k, v in sorted(_iteritems(self.__dict__))])
+                            for k, v in sorted(_iteritems(self.__dict__))
+                            if not k.startswith('_')])
         return "%s(%s)" % (type(self).__name__, values)
 
 
+class NodeRegistry(object):
+    """Nodes grouped by type.
+
+    Picking a random node of a given type and removing a node are both
+    constant time operations, regardless of the number of nodes registered.
+
+    The nodes are identified by their object, as stored in the registry.
+    Another object referencing the same node isn't recognized.
+
+    The types are either node type names, or node type identifiers. Nodes
+    registered with a type name are not found through the type identifier of
+    that same type, and vice versa.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self._nodes = {}
+        self._types = {}
+        self._indices = {}
+
+    def add(self, type, node):
+        """Register a node.
+
+        Parameters
+        ----------
+        type : maya.OpenMaya.MTypeId or str
+            Type of the node.
+        node : maya.OpenMaya.MObject
+            Node object.
+        """
+        type = _getTypeKey(type)
+        nodes = self._nodes.get(type)
+        if nodes is None:
+            nodes = self._nodes[type] = []
+
+        key = id(node)
+        self._types[key] = type
+        self._indices[key] = len(nodes)
+        nodes.append(node)
+
+    def extend(self, type, nodes):
+        """Register several nodes of a same type.
+
+        Parameters
+        ----------
+        type : maya.OpenMaya.MTypeId or str
+            Type of the nodes.
+        nodes : list of maya.OpenMaya.MObject
+            Node objects.
+        """
+        type = _getTypeKey(type)
+        registered = self._nodes.get(type)
+        if registered is None:
+            registered = self._nodes[type] = []
+
+        types = self._types
+        indices = self._indices
+        for index, node in enumerate(nodes, len(registered)):
+            key = id(node)
+            types[key] = type
+            indices[key] = index
+
+        registered.extend(nodes)
+
+    def remove(self, node):
+        """Unregister a node.
+
+        The last node of the same type takes the place of the node removed.
+
+        Parameters
+        ----------
+        node : maya.OpenMaya.MObject
+            Node object, as registered.
+
+        Raises
+        ------
+        KeyError
+            The node isn't registered.
+        """
+        key = id(node)
+        nodes = self._nodes[self._types.pop(key)]
+        index = self._indices.pop(key)
+        last = nodes.pop()
+        if last is not node:
+            nodes[index] = last
+            self._indices[id(last)] = index
+
+    def pick(self, type, generator):
+        """Randomly pick a node of a given type.
+
+        Parameters
+        ----------
+        type : maya.OpenMaya.MTypeId or str
+            Type of the node.
+        generator : random.Random
+            Pseudo-random number generator.
+
+        Returns
+        -------
+        maya.OpenMaya.MObject
+            The node object picked, or ``None`` if no node of that type is
+            registered.
+        """
+        nodes = self._nodes.get(_getTypeKey(type))
+        if not nodes:
+            return None
+
+        return nodes[int(generator.random() * len(nodes))]
+
+    def count(self, type=None):
+        """Count the nodes registered.
+
+        Parameters
+        ----------
+        type : maya.OpenMaya.MTypeId or str
+            Type of the nodes to count. If ``None``, all the nodes are
+            counted.
+
+        Returns
+        -------
+        int
+            The number of nodes.
+        """
+        if type is None:
+            return len(self._types)
+
+        return len(self._nodes.get(_getTypeKey(type), ()))
+
+    def __contains__(self, node):
+        return id(node) in self._types
+
+    def __len__(self):
+        return len(self._types)
+
+    def __repr__(self):
+        counts = ', '.join(['%r: %r' % (nodeType, len(nodes))
+                            for nodeType, nodes in _iteritems(self._nodes)
+                            if nodes])
+        return "%s({%s})" % (type(self).__name__, counts)
+
+
+class Hierarchy(object):
+    """Parent-child relationships between transform nodes.
+
+    Each node is identified by an index, in the order in which the nodes were
+    added. The relationships are stored in arrays indexed by node, with the
+    children of a node being chained as a doubly linked list, allowing to
+    update the parent of a node in constant time, plus the time needed to
+    update the depth of its descendants.
+
+    Attributes
+    ----------
+    nodes : list of maya.OpenMaya.MObject
+        Node object of each node.
+    parents : array of int
+        Index of the parent of each node, or -1 for the nodes parented under
+        the world.
+    depths : array of int
+        Depth of each node, starting at 1 for the nodes parented under the
+        world.
+    childCounts : array of int
+        Number of children of each node.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self.nodes = []
+        self.parents = array.array('l')
+        self.depths = array.array('l')
+        self.childCounts = array.array('l')
+        self._firstChildren = array.array('l')
+        self._nextSiblings = array.array('l')
+        self._previousSiblings = array.array('l')
+        self._indices = {}
+        self._parentIndices = {}
+
+    def add(self, node, parent=-1):
+        """Add a node.
+
+        Parameters
+        ----------
+        node : maya.OpenMaya.MObject
+            Node object.
+        parent : int
+            Index of the parent node, or -1 to parent the node under the
+            world.
+
+        Returns
+        -------
+        int
+            The index of the new node.
+        """
+        index = len(self.nodes)
+        self._indices[id(node)] = index
+        self.nodes.append(node)
+        self.parents.append(-1)
+        self.depths.append(self.depths[parent] + 1 if parent >= 0 else 1)
+        self.childCounts.append(0)
+        self._firstChildren.append(-1)
+        self._nextSiblings.append(-1)
+        self._previousSiblings.append(-1)
+        if parent >= 0:
+            self._link(index, parent)
+
+        for parentIndex in self._parentIndices.values():
+            parentIndex.append()
+            parentIndex.refresh(index)
+            if parent >= 0:
+                parentIndex.refresh(parent)
+
+        return index
+
+    def find(self, node):
+        """Find the index of a node.
+
+        Parameters
+        ----------
+        node : maya.OpenMaya.MObject
+            Node object, as added.
+
+        Returns
+        -------
+        int
+            The index of the node, or -1 if it wasn't added.
+        """
+        return self._indices.get(id(node), -1)
+
+    def setParent(self, index, parent):
+        """Change the parent of a node.
+
+        Parameters
+        ----------
+        index : int
+            Index of the node.
+        parent : int
+            Index of the new parent node, or -1 to parent the node under the
+            world. It is expected to not be a descendant of the node.
+        """
+        previousParent = self.parents[index]
+        self._unlink(index)
+        if parent >= 0:
+            self._link(index, parent)
+
+        depth = self.depths[parent] + 1 if parent >= 0 else 1
+        offset = depth - self.depths[index]
+        if offset:
+            self._offsetDepths(index, offset)
+
+        for parentIndex in self._parentIndices.values():
+            for node in (previousParent, parent):
+                if node >= 0:
+                    parentIndex.refresh(node)
+
+    def isAncestor(self, ancestor, index):
+        """Check if a node is an ancestor of another.
+
+        This runs in a time proportional to the difference of depth between
+        both nodes.
+
+        Parameters
+        ----------
+        ancestor : int
+            Index of the node that might be an ancestor.
+        index : int
+            Index of the node that might be a descendant.
+
+        Returns
+        -------
+        bool
+            ``True`` if the node ``ancestor`` is a strict ancestor of the
+            node ``index``.
+        """
+        parents = self.parents
+        for _ in _range(self.depths[index] - self.depths[ancestor]):
+            index = parents[index]
+            if index == ancestor:
+                return True
+
+        return False
+
+    def pick(self, generator):
+        """Randomly pick a node.
+
+        Parameters
+        ----------
+        generator : random.Random
+            Pseudo-random number generator.
+
+        Returns
+        -------
+        int
+            The index of the node picked, or -1 if there are no nodes.
+        """
+        count = len(self.nodes)
+        return int(generator.random() * count) if count else -1
+
+    def pickNonDescendant(self, index, generator, attempts=8):
+        """Randomly pick a node that could be the new parent of another.
+
+        Nodes are randomly picked until one that is neither the node itself,
+        nor one of its descendants, is found. This runs in a constant time on
+        average for hierarchies of a bounded depth.
+
+        Parameters
+        ----------
+        index : int
+            Index of the node.
+        generator : random.Random
+            Pseudo-random number generator.
+        attempts : int
+            Maximum number of nodes to try.
+
+        Returns
+        -------
+        int
+            The index of the node picked, or -1 if no valid node was found.
+        """
+        count = len(self.nodes)
+        for _ in _range(attempts if count > 1 else 0):
+            candidate = int(generator.random() * count)
+            if (candidate != index
+                    and not self.isAncestor(index, candidate)):
+                return candidate
+
+        return -1
+
+    def pickParent(self, policy, generator):
+        """Randomly pick a node that could be the parent of a new node.
+
+        Only the nodes allowing a new child under the constraints of the
+        policy are considered. Without depth weights, a node is uniformly
+        picked among them in constant time. Otherwise, a depth is first
+        picked among the ones having such nodes, then a node is picked at
+        that depth, which runs in a time logarithmic in the number of
+        weights. The nodes are indexed the first time that a policy with new
+        constraints is used.
+
+        Parameters
+        ----------
+        policy : revl.HierarchyPolicy
+            Hierarchy policy.
+        generator : random.Random
+            Pseudo-random number generator.
+
+        Returns
+        -------
+        int
+            The index of the node picked, or -1 if no valid node was found.
+        """
+        key = (policy.maxDepth, policy.maxChildren)
+        parentIndex = self._parentIndices.get(key)
+        if parentIndex is None:
+            parentIndex = self._parentIndices[key] = _ParentIndex(self, *key)
+
+        return parentIndex.pick(generator, policy.depthWeights)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return "%s(nodes=%r)" % (type(self).__name__, self.nodes)
+
+    def _link(self, index, parent):
+        """Chain a node to the children of a parent."""
+        firstChild = self._firstChildren[parent]
+        if firstChild >= 0:
+            self._previousSiblings[firstChild] = index
+
+        self._nextSiblings[index] = firstChild
+        self._previousSiblings[index] = -1
+        self._firstChildren[parent] = index
+        self.childCounts[parent] += 1
+        self.parents[index] = parent
+
+    def _unlink(self, index):
+        """Remove a node from the children of its parent."""
+        parent = self.parents[index]
+        if parent < 0:
+            return
+
+        nextSibling = self._nextSiblings[index]
+        previousSibling = self._previousSiblings[index]
+        if previousSibling >= 0:
+            self._nextSiblings[previousSibling] = nextSibling
+        else:
+            self._firstChildren[parent] = nextSibling
+
+        if nextSibling >= 0:
+            self._previousSiblings[nextSibling] = previousSibling
+
+        self._nextSiblings[index] = -1
+        self._previousSiblings[index] = -1
+        self.childCounts[parent] -= 1
+        self.parents[index] = -1
+
+    def _offsetDepths(self, index, offset):
+        """Offset the depth of a node and of its descendants."""
+        depths = self.depths
+        firstChildren = self._firstChildren
+        nextSiblings = self._nextSiblings
+        parentIndices = list(self._parentIndices.values())
+        stack = [index]
+        while stack:
+            current = stack.pop()
+            depths[current] += offset
+            for parentIndex in parentIndices:
+                parentIndex.refresh(current)
+
+            child = firstChildren[current]
+            while child >= 0:
+                stack.append(child)
+                child = nextSiblings[child]
+
+
+class _ParentIndex(object):
+    """Nodes of a hierarchy allowing a new child, grouped by depth.
+
+    Attributes
+    ----------
+    nodes : list of int
+        Index of the nodes allowing a new child.
+    buckets : list of list of int
+        Index of the nodes allowing a new child, for each depth starting at
+        depth 1.
+    """
+
+    def __init__(self, hierarchy, maxDepth, maxChildren):
+        """Constructor.
+
+        Parameters
+        ----------
+        hierarchy : revl.Hierarchy
+            Hierarchy to index.
+        maxDepth : int
+            Maximum depth of a child, or ``None``.
+        maxChildren : int
+            Maximum number of children of a node, or ``None``.
+        """
+        self.nodes = []
+        self.buckets = []
+        self._hierarchy = hierarchy
+        self._maxDepth = maxDepth
+        self._maxChildren = maxChildren
+        self._depths = array.array('l')
+        self._positions = array.array('l')
+        self._nodePositions = array.array('l')
+        self._trees = {}
+        self._depthWeights = None
+        self._tree = None
+        for index in _range(len(hierarchy)):
+            self.append()
+            self.refresh(index)
+
+    def append(self):
+        """Make room for a new node of the hierarchy."""
+        self._depths.append(0)
+        self._positions.append(-1)
+        self._nodePositions.append(-1)
+
+    def pick(self, generator, depthWeights=None):
+        """Randomly pick a node allowing a new child.
+
+        Parameters
+        ----------
+        generator : random.Random
+            Pseudo-random number generator.
+        depthWeights : list of float
+            Probability for the node to be picked at each depth. If ``None``,
+            the node is uniformly picked.
+
+        Returns
+        -------
+        int
+            The index of the node picked, or -1 if no valid node was found.
+        """
+        if depthWeights is None:
+            nodes = self.nodes
+            if not nodes:
+                return -1
+
+            return nodes[int(generator.random() * len(nodes))]
+
+        # The weights of the last policy used are looked up by identity to
+        # spare building a key each time.
+        if depthWeights is not self._depthWeights:
+            key = tuple(depthWeights)
+            tree = self._trees.get(key)
+            if tree is None:
+                buckets = self.buckets
+                tree = self._trees[key] = _WeightTree(
+                    [weight if depth < len(buckets) and buckets[depth]
+                     else 0.0
+                     for depth, weight in enumerate(key)])
+
+            self._depthWeights = depthWeights
+            self._tree = tree
+
+        tree = self._tree
+        if not tree.count:
+            return -1
+
+        bucket = self.buckets[tree.find(generator.random() * tree.total())]
+        return bucket[int(generator.random() * len(bucket))]
+
+    def refresh(self, index):
+        """Update the bucket of a node after a change in the hierarchy.
+
+        Parameters
+        ----------
+        index : int
+            Index of the node.
+        """
+        hierarchy = self._hierarchy
+        depth = hierarchy.depths[index]
+        if ((self._maxDepth is not None and depth >= self._maxDepth)
+                or (self._maxChildren is not None
+                    and hierarchy.childCounts[index] >= self._maxChildren)):
+            depth = 0
+
+        current = self._depths[index]
+        if depth == current:
+            return
+
+        if current:
+            bucket = self.buckets[current - 1]
+            position = self._positions[index]
+            last = bucket.pop()
+            if last != index:
+                bucket[position] = last
+                self._positions[last] = position
+
+            if not bucket:
+                self._updateTrees(current - 1, False)
+
+        if depth:
+            while len(self.buckets) < depth:
+                self.buckets.append([])
+
+            bucket = self.buckets[depth - 1]
+            self._positions[index] = len(bucket)
+            bucket.append(index)
+            if len(bucket) == 1:
+                self._updateTrees(depth - 1, True)
+        else:
+            self._positions[index] = -1
+
+        nodes = self.nodes
+        if not current:
+            self._nodePositions[index] = len(nodes)
+            nodes.append(index)
+        elif not depth:
+            position = self._nodePositions[index]
+            last = nodes.pop()
+            if last != index:
+                nodes[position] = last
+                self._nodePositions[last] = position
+
+            self._nodePositions[index] = -1
+
+        self._depths[index] = depth
+
+    def _updateTrees(self, depth, filled):
+        """Update the weight of a depth after its bucket emptied or filled."""
+        for key, tree in _iteritems(self._trees):
+            if depth < len(key):
+                tree.update(depth, key[depth] if filled else 0.0)
+
+
+class _WeightTree(object):
+    """Weights stored in a Fenwick tree.
+
+    Updating a weight, computing the total of the weights, and finding the
+    position of a cumulated weight all run in a time logarithmic in the
+    number of weights.
+
+    Attributes
+    ----------
+    count : int
+        Number of positive weights.
+    """
+
+    def __init__(self, weights):
+        """Constructor.
+
+        Parameters
+        ----------
+        weights : list of float
+            Weights.
+        """
+        self.count = 0
+        self._weights = [0.0] * len(weights)
+        self._tree = [0.0] * (len(weights) + 1)
+        for index, weight in enumerate(weights):
+            self.update(index, weight)
+
+    def update(self, index, weight):
+        """Change a weight.
+
+        Parameters
+        ----------
+        index : int
+            Index of the weight.
+        weight : float
+            New weight. Negative values are treated as zero.
+        """
+        weight = max(weight, 0.0)
+        previous = self._weights[index]
+        self.count += (weight > 0.0) - (previous > 0.0)
+        self._weights[index] = weight
+        delta = weight - previous
+        tree = self._tree
+        position = index + 1
+        while position < len(tree):
+            tree[position] += delta
+            position += position & -position
+
+    def total(self):
+        """Compute the sum of the weights.
+
+        Returns
+        -------
+        float
+            The sum.
+        """
+        out = 0.0
+        tree = self._tree
+        position = len(tree) - 1
+        while position:
+            out += tree[position]
+            position -= position & -position
+
+        return out
+
+    def find(self, threshold):
+        """Find the weight at which the cumulated weights exceed a threshold.
+
+        Parameters
+        ----------
+        threshold : float
+            Threshold, in the range [0, total).
+
+        Returns
+        -------
+        int
+            The index of the weight, which is always positive.
+        """
+        tree = self._tree
+        size = len(tree) - 1
+        position = 0
+        mask = 1 << (size.bit_length() - 1) if size else 0
+        while mask:
+            candidate = position + mask
+            if candidate <= size and tree[candidate] <= threshold:
+                position = candidate
+                threshold -= tree[candidate]
+
+            mask >>= 1
+
+        weights = self._weights
+        if position >= size or weights[position] <= 0.0:
+            # Guard against the accumulated rounding errors by settling on
+            # the last positive weight.
+            position = max(i for i in _range(size) if weights[i] > 0.0)
+
+        return position
+
+
+_HierarchyPolicy = collections.namedtuple(
+    'HierarchyPolicy', (
+        'maxDepth',
+        'maxChildren',
+        'depthWeights',
+    ))
+_HierarchyPolicy.__new__.__defaults__ = (None, None, None)
+
+
+class HierarchyPolicy(_HierarchyPolicy):
+    """Constraints on the parent picked for new transform nodes.
+
+    This is used as a parameter for the :func:`createTransform` and
+    :func:`createPrimitive` functions, allowing for example to generate
+    either wide and shallow, or deep and narrow hierarchies. When no parent
+    satisfies the constraints, the new transform is parented under the
+    world.
+
+    Attributes
+    ----------
+    maxDepth : int
+        Maximum depth of the new transforms, with the transforms parented
+        under the world being at depth 1. If ``None``, the depth is
+        unbounded.
+    maxChildren : int
+        Maximum number of transforms that a transform can have as children.
+        If ``None``, the number of children is unbounded.
+    depthWeights : list of float
+        Probability for the parent to be picked at each depth, starting at
+        depth 1. The values are relative to each other, and the depths
+        without any weight are never picked. If ``None``, the parent is
+        uniformly picked among all the transforms satisfying the constraints.
+    """
+
+    __slots__ = ()
+
+
 _Command = collections.namedtuple(
     'Command', (
         'weight',
@@ -205,46 +1171,488 @@ class PrimitiveType(object):
     _LAST = POLY_TORUS
 
 
-_PrimitiveTraits = collections.namedtuple(
-    '_PrimitiveTraits', (
-        'type',
-        'shapeType',
-        'outPlugs',
-        'inPlug',
+class Sampling(object):
+    """Enumerator for the strategies used to randomly pick commands.
+
+    This is used as a parameter for the :func:`run` function.
+
+    Attributes
+    ----------
+    LINEAR
+        Walk through the commands until reaching the one picked. The cost of
+        each pick grows linearly with the number of commands.
+    BISECT
+        Bisect a table of cumulative weights. The cost of each pick grows
+        logarithmically with the number of commands.
+    ALIAS
+        Look up an alias table built with Vose's method. Each pick runs in
+        constant time, regardless of the number of commands.
+    NUMPY
+        Draw all the picks at once with a single vectorized search through
+        the cumulative weights. This requires NumPy and falls back to
+        :attr:`ALIAS` if it cannot be imported.
+    """
+
+    LINEAR = 0
+    BISECT = 1
+    ALIAS = 2
+    NUMPY = 3
+
+
+_Schedule = collections.namedtuple(
+    'Schedule', (
+        'indices',
+        'values',
     ))
 
 
-def _defineCurveTraits(type, outPlugs=None):
-    outPlugs = ['outputCurve'] if outPlugs is None else outPlugs
-    return _PrimitiveTraits(type=type, shapeType='nurbsCurve',
-                            outPlugs=outPlugs, inPlug='create')
+class Schedule(_Schedule):
+    """Precomputed sequence of commands.
 
+    An instance of this class is returned by the :func:`plan` function.
 
-def _defineMeshTraits(type):
-    return _PrimitiveTraits(type=type, shapeType='mesh', outPlugs=['output'],
-                            inPlug='inMesh')
+    Attributes
+    ----------
+    indices : array of int
+        Index of each command to run, in order, within the set of commands
+        that was planned.
+    values : array of float
+        Pseudo-random numbers in the range [0.0, 1.0) to be consumed in order
+        by the command functions in place of the context's generator.
+    """
 
+    __slots__ = ()
 
-def _defineSurfaceTraits(type, outPlugs=None):
-    outPlugs = ['outputSurface'] if outPlugs is None else outPlugs
-    return _PrimitiveTraits(type=type, shapeType='nurbsSurface',
-                            outPlugs=outPlugs, inPlug='create')
 
+_Summary = collections.namedtuple(
+    'Summary', (
+        'count',
+        'elapsed',
+    ))
 
-_PRIMITIVE_TRAITS = {
-    PrimitiveType.NURBS_CIRCLE: _defineCurveTraits('makeNurbCircle'),
-    PrimitiveType.NURBS_CONE: _defineSurfaceTraits('makeNurbCone'),
-    PrimitiveType.NURBS_CUBE: _defineSurfaceTraits(
-        'makeNurbCube', outPlugs=['outputSurface%s' % (_i if _i > 0 else '',)
-                                  for _i in _range(6)]),
-    PrimitiveType.NURBS_CYLINDER: _defineSurfaceTraits('makeNurbCylinder'),
-    PrimitiveType.NURBS_PLANE: _defineSurfaceTraits('makeNurbPlane'),
-    PrimitiveType.NURBS_SPHERE: _defineSurfaceTraits('makeNurbSphere'),
-    PrimitiveType.NURBS_SQUARE: _defineCurveTraits(
-        'makeNurbsSquare', outPlugs=['outputCurve%s' % (_i,)
-                                     for _i in _range(1, 5)]),
-    PrimitiveType.NURBS_TORUS: _defineSurfaceTraits('makeNurbTorus'),
-    PrimitiveType.POLY_CONE: _defineMeshTraits('polyCone'),
+
+class Summary(_Summary):
+    """Outcome of a run.
+
+    An instance of this class is stored in the :attr:`Context.summary`
+    attribute by the :func:`run` and :func:`execute` functions.
+
+    Attributes
+    ----------
+    count : int
+        Number of commands run.
+    elapsed : float
+        Time spent running the commands and applying their operations, in
+        seconds.
+    """
+
+    __slots__ = ()
+
+    @property
+    def rate(self):
+        """Number of commands run per second, or ``None`` if unknown."""
+        return self.count / self.elapsed if self.elapsed > 0.0 else None
+
+
+_HISTOGRAM_SIZE = 32
+
+
+class CommandStats(object):
+    """Timing statistics of a command.
+
+    The durations are expressed in seconds.
+
+    Attributes
+    ----------
+    command : revl.Command
+        Command.
+    count : int
+        Number of times that the command was run.
+    total : float
+        Total time spent running the command.
+    min : float
+        Shortest run, or ``None`` if the command was never run.
+    max : float
+        Longest run, or ``None`` if the command was never run.
+    histogram : list of int
+        Number of runs for each latency bucket. The bucket at index ``i``
+        counts the runs that lasted at least ``2 ** (i - 1)`` microseconds
+        but less than ``2 ** i`` microseconds, with the first bucket counting
+        the runs that lasted less than one microsecond and the last bucket
+        also counting all the longer runs.
+    """
+
+    def __init__(self, command):
+        """Constructor.
+
+        Parameters
+        ----------
+        command : revl.Command
+            Command.
+        """
+        self.command = command
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = [0] * _HISTOGRAM_SIZE
+
+    def _record(self, elapsed):
+        """Account for a run of the command.
+
+        Parameters
+        ----------
+        elapsed : float
+            Duration of the run.
+        """
+        self.count += 1
+        self.total += elapsed
+        if self.min is None or elapsed < self.min:
+            self.min = elapsed
+
+        if self.max is None or elapsed > self.max:
+            self.max = elapsed
+
+        bucket = min(int(elapsed * 1e6).bit_length(), _HISTOGRAM_SIZE - 1)
+        self.histogram[bucket] += 1
+
+    @property
+    def mean(self):
+        """Average duration of a run, or ``None`` if it was never run."""
+        return self.total / self.count if self.count else None
+
+    def __repr__(self):
+        return ("%s(command=%r, count=%r, total=%r, min=%r, max=%r)"
+                % (type(self).__name__, self.command, self.count, self.total,
+                   self.min, self.max))
+
+
+class Stats(object):
+    """Timing statistics of a run.
+
+    An instance of this class is stored in the :attr:`Context.stats`
+    attribute when the instrumentation is requested. The durations are
+    expressed in seconds.
+
+    Attributes
+    ----------
+    commands : list of revl.CommandStats
+        Statistics for each command from the set, in order.
+    dagDoIt : float
+        Total time spent applying the operations of the DAG modifiers.
+    dgDoIt : float
+        Total time spent applying the operations of the DG modifiers.
+    """
+
+    def __init__(self, commands):
+        """Constructor.
+
+        Parameters
+        ----------
+        commands : list of revl.Command
+            Commands to gather statistics for.
+        """
+        self.commands = [CommandStats(command) for command in commands]
+        self.dagDoIt = 0.0
+        self.dgDoIt = 0.0
+
+    def __repr__(self):
+        return ("%s(commands=%r, dagDoIt=%r, dgDoIt=%r)"
+                % (type(self).__name__, self.commands, self.dagDoIt,
+                   self.dgDoIt))
+
+
+class Hook(object):
+    """Observer of the evaluation of the commands.
+
+    The methods of this base class do nothing. Subclasses only need to
+    override the ones that they are interested in.
+
+    The hooks registered are notified in order before an event, and in
+    reverse order after it.
+    """
+
+    def beforeCommand(self, context, index, command, step):
+        """Called before running a command.
+
+        Parameters
+        ----------
+        context : revl.Context
+            Command context.
+        index : int
+            Index of the command within the set of commands.
+        command : revl.Command
+            Command.
+        step : int
+            Number of commands run before this one.
+        """
+        pass
+
+    def afterCommand(self, context, index, command, step):
+        """Called after running a command.
+
+        Parameters
+        ----------
+        context : revl.Context
+            Command context.
+        index : int
+            Index of the command within the set of commands.
+        command : revl.Command
+            Command.
+        step : int
+            Number of commands run before this one.
+        """
+        pass
+
+    def beforeDoIt(self, context, modifier):
+        """Called before applying the pending operations of a modifier.
+
+        Parameters
+        ----------
+        context : revl.Context
+            Command context.
+        modifier : maya.OpenMaya.MDGModifier
+            Modifier, either the DAG or the DG one of the context.
+        """
+        pass
+
+    def afterDoIt(self, context, modifier):
+        """Called after applying the pending operations of a modifier.
+
+        Parameters
+        ----------
+        context : revl.Context
+            Command context.
+        modifier : maya.OpenMaya.MDGModifier
+            Modifier, either the DAG or the DG one of the context.
+        """
+        pass
+
+
+class _StatsHook(Hook):
+    """Hook timing the commands into the statistics of a context."""
+
+    def __init__(self, stats):
+        self._entries = stats.commands
+        self._start = None
+
+    def beforeCommand(self, context, index, command, step):
+        self._start = _clock()
+
+    def afterCommand(self, context, index, command, step):
+        self._entries[index]._record(_clock() - self._start)
+
+
+class SceneCache(object):
+    """On-disk cache of the scenes generated by the :func:`run` function.
+
+    Each scene is saved as a Maya binary file named after a fingerprint of
+    the parameters that it was generated with, that is the consolidated set
+    of commands, the number of commands and of nodes to reach, the seed, the
+    sampling strategy, the flushing interval, the backend, the node tracking
+    and the type of the pseudo-random number generator of the context, and
+    the version of this module. The least recently used scenes are evicted
+    when the cache grows over its size limit.
+
+    Runs that can't be reproduced are never cached. This is the case when no
+    seed is defined, when a time budget is defined, when the context already
+    created some nodes, or when some of the command arguments are not
+    hashable, or not made of built-in values, classes, and functions
+    referenced by their qualified name. Methods bound to an instance and
+    other callable objects can't be identified by their name alone and
+    aren't cached either.
+
+    Attributes
+    ----------
+    path : str
+        Path to the directory storing the scenes.
+    maxSize : int
+        Maximum total size of the scenes, in bytes. If ``None``, the size is
+        unbounded.
+    hits : int
+        Number of scenes loaded from the cache.
+    misses : int
+        Number of scenes generated and saved into the cache.
+    """
+
+    def __init__(self, path, maxSize=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        path : str
+            Path to the directory storing the scenes. It is created if it
+            doesn't exist.
+        maxSize : int
+            Maximum total size of the scenes, in bytes. If ``None``, the size
+            is unbounded.
+        """
+        self.path = path
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def run(self, commands, count=None, seed=None, context=None,
+            sampling=Sampling.NUMPY, untilNodes=None, **kwargs):
+        """Load a scene from the cache, or generate it with :func:`run`.
+
+        The current scene is replaced, either with the scene loaded, or with
+        a new one before generating it, so that the scenes saved only contain
+        the nodes generated. This doesn't apply to the runs that can't be
+        cached, which are directly forwarded to :func:`run`.
+
+        When a scene is loaded from the cache, the context returned doesn't
+        track any of the nodes from that scene and no hook is notified.
+
+        Parameters
+        ----------
+        commands : list of revl.Command or compatible tuple
+            Set of weighted commands.
+        count : int
+            Total number of commands to be run.
+        seed : object
+            Hashable object to define the starting seed of the pseudo-random
+            number generations. If ``None``, the cache isn't used.
+        context : revl.Context
+            Context to use. If ``None``, a new one is created. If the context
+            already created some nodes, the cache isn't used.
+        sampling : int
+            Strategy used to randomly pick the commands. Available values are
+            enumerated in the :class:`Sampling` class.
+        untilNodes : int
+            Number of nodes after which no more commands are run.
+        kwargs
+            Keyword arguments to pass to :func:`run`.
+
+        Returns
+        -------
+        revl.Context
+            The context after loading the scene or evaluating the commands.
+        """
+        if context is None:
+            context = Context()
+
+        key = None
+        if (seed is not None and kwargs.get('duration') is None
+                and _isPristine(context)):
+            description = tuple(
+                (c.weight, c.function, tuple(c.args or ()),
+                 tuple(sorted(_iteritems(c.kwargs or {}))))
+                for c in _consolidate(commands))
+            key = _fingerprint((__version__, context.backend,
+                                context.trackNodes, type(context.random),
+                                description, count, seed, sampling,
+                                untilNodes, kwargs.get('flushEvery')))
+
+        if key is None:
+            return run(commands, count=count, seed=seed, context=context,
+                       sampling=sampling, untilNodes=untilNodes, **kwargs)
+
+        fileIO = context._binding.OpenMaya.MFileIO
+        filePath = os.path.join(self.path, key + '.mb')
+        if os.path.isfile(filePath):
+            fileIO.open(filePath, 'mayaBinary', True)
+            os.utime(filePath, None)
+            context.summary = None
+            self.hits += 1
+            return context
+
+        fileIO.newFile(True)
+        run(commands, count=count, seed=seed, context=context,
+            sampling=sampling, untilNodes=untilNodes, **kwargs)
+        fileIO.exportAll(filePath, 'mayaBinary')
+        self.misses += 1
+        self._evict(filePath)
+        return context
+
+    def clear(self):
+        """Remove all the scenes from the cache."""
+        for filePath, _, _ in self._listEntries():
+            os.remove(filePath)
+
+    def _listEntries(self):
+        """List the scenes from the cache.
+
+        Returns
+        -------
+        list of tuple
+            Path, time of last access, and size of each scene.
+        """
+        entries = []
+        for fileName in os.listdir(self.path):
+            if not fileName.endswith('.mb'):
+                continue
+
+            filePath = os.path.join(self.path, fileName)
+            status = os.stat(filePath)
+            entries.append((filePath, status.st_mtime, status.st_size))
+
+        return entries
+
+    def _evict(self, keep):
+        """Remove the least recently used scenes to fit the size limit.
+
+        Parameters
+        ----------
+        keep : str
+            Path to a scene that is never removed.
+        """
+        if self.maxSize is None:
+            return
+
+        entries = self._listEntries()
+        size = sum(entry[2] for entry in entries)
+        for filePath, _, fileSize in sorted(entries, key=lambda x: x[1]):
+            if size <= self.maxSize:
+                break
+
+            if filePath != keep:
+                os.remove(filePath)
+                size -= fileSize
+
+
+_PrimitiveTraits = collections.namedtuple(
+    '_PrimitiveTraits', (
+        'type',
+        'shapeType',
+        'outPlugs',
+        'inPlug',
+    ))
+
+
+def _defineCurveTraits(type, outPlugs=None):
+    outPlugs = ['outputCurve'] if outPlugs is None else outPlugs
+    return _PrimitiveTraits(type=type, shapeType='nurbsCurve',
+                            outPlugs=outPlugs, inPlug='create')
+
+
+def _defineMeshTraits(type):
+    return _PrimitiveTraits(type=type, shapeType='mesh', outPlugs=['output'],
+                            inPlug='inMesh')
+
+
+def _defineSurfaceTraits(type, outPlugs=None):
+    outPlugs = ['outputSurface'] if outPlugs is None else outPlugs
+    return _PrimitiveTraits(type=type, shapeType='nurbsSurface',
+                            outPlugs=outPlugs, inPlug='create')
+
+
+_PRIMITIVE_TRAITS = {
+    PrimitiveType.NURBS_CIRCLE: _defineCurveTraits('makeNurbCircle'),
+    PrimitiveType.NURBS_CONE: _defineSurfaceTraits('makeNurbCone'),
+    PrimitiveType.NURBS_CUBE: _defineSurfaceTraits(
+        'makeNurbCube', outPlugs=['outputSurface%s' % (_i if _i > 0 else '',)
+                                  for _i in _range(6)]),
+    PrimitiveType.NURBS_CYLINDER: _defineSurfaceTraits('makeNurbCylinder'),
+    PrimitiveType.NURBS_PLANE: _defineSurfaceTraits('makeNurbPlane'),
+    PrimitiveType.NURBS_SPHERE: _defineSurfaceTraits('makeNurbSphere'),
+    PrimitiveType.NURBS_SQUARE: _defineCurveTraits(
+        'makeNurbsSquare', outPlugs=['outputCurve%s' % (_i,)
+                                     for _i in _range(1, 5)]),
+    PrimitiveType.NURBS_TORUS: _defineSurfaceTraits('makeNurbTorus'),
+    PrimitiveType.POLY_CONE: _defineMeshTraits('polyCone'),
     PrimitiveType.POLY_CUBE: _defineMeshTraits('polyCube'),
     PrimitiveType.POLY_HELIX: _defineMeshTraits('polyHelix'),
     PrimitiveType.POLY_CYLINDER: _defineMeshTraits('polyCylinder'),
@@ -259,6 +1667,70 @@ _PRIMITIVE_TRAITS = {
 }
 
 
+_PrimitiveAttributes = collections.namedtuple(
+    '_PrimitiveAttributes', (
+        'outPlugs',
+        'inPlug',
+    ))
+
+
+def _getPrimitiveAttributes(binding, type):
+    """Retrieve the attribute objects of the plugs used by a primitive type.
+
+    The attributes are looked up by name once per backend and cached for later
+    calls.
+
+    Parameters
+    ----------
+    binding : revl._Binding
+        Objects bound to the backend.
+    type : int
+        Primitive type.
+
+    Returns
+    -------
+    revl._PrimitiveAttributes
+        The attributes for each output plug of the generator node and the
+        attribute for the input plug of the shape nodes.
+    """
+    attributes = binding.primitiveAttributes.get(type)
+    if attributes is None:
+        traits = _PRIMITIVE_TRAITS[type]
+        generator = binding.OpenMaya.MNodeClass(traits.type)
+        shape = binding.OpenMaya.MNodeClass(traits.shapeType)
+        attributes = _PrimitiveAttributes(
+            outPlugs=[generator.attribute(name) for name in traits.outPlugs],
+            inPlug=shape.attribute(traits.inPlug))
+        binding.primitiveAttributes[type] = attributes
+
+    return attributes
+
+
+def getDefaultBackend():
+    """Retrieve the backend used by default by new contexts.
+
+    Returns
+    -------
+    int
+        The default backend.
+    """
+    return _defaultBackend
+
+
+def setDefaultBackend(backend):
+    """Set the backend used by default by new contexts.
+
+    Parameters
+    ----------
+    backend : int
+        Backend. Available values are enumerated in the :class:`Backend`
+        class.
+    """
+    global _defaultBackend
+    _getBinding(backend)
+    _defaultBackend = backend
+
+
 def validate(commands):
     """Check if the commands are well-formed.
 
@@ -333,12 +1805,20 @@ def validate(commands):
     return True
 
 
-def run(commands, count, seed=None, context=None):
+def run(commands, count=None, seed=None, context=None,
+        sampling=Sampling.NUMPY, flushEvery=None, instrument=False,
+        hooks=None, duration=None, untilNodes=None):
     """Randomly run weighted commands from a set.
 
     Each command comes with a weight which determines the probabilities for
     that command to be run.
 
+    The run stops as soon as any of the limits defined by the parameters
+    ``count``, ``duration``, and ``untilNodes`` is reached. The last two
+    are only checked between batches of commands, hence they might be
+    slightly exceeded. The number of commands run is then available in the
+    :attr:`Context.summary` attribute of the context returned.
+
     Use :func:`validate` to check if the input command set is well-formed.
 
     Parameters
@@ -348,20 +1828,51 @@ def run(commands, count, seed=None, context=None):
     count : int
         Total number of commands to be run. Setting a count greater than the
         number of weighted commands doesn't guarantee that each command will
-        be run once. Some might be run multiple times instead.
+        be run once. Some might be run multiple times instead. If ``None``,
+        the number of commands is only bounded by the other limits.
     seed : object
         Hashable object to define the starting seed of the pseudo-random
         number generations. If ``None``, the current system time is used.
         Running multiple times a same set of commands with a same fixed seed
-        that is not ``None`` produces identitcal results.
+        that is not ``None`` produces identitcal results, as long as the
+        same sampling strategy is used.
     context : revl.Context
         Context to use. If ``None``, a new one is created.
+    sampling : int
+        Strategy used to randomly pick the commands. Available values are
+        enumerated in the :class:`Sampling` class.
+    flushEvery : int
+        Number of commands to run before applying the pending operations with
+        :meth:`Context.flush`, to keep the memory usage bounded. The commands
+        are then also picked in batches rather than all at once. If ``None``,
+        the operations are only applied once all the commands have been run.
+    instrument : bool
+        ``True`` to time each command and each application of the modifiers.
+        The statistics are then available in the :attr:`Context.stats`
+        attribute of the context returned.
+    hooks : list of revl.Hook
+        Observers to notify while running the commands, replacing the ones
+        from the :attr:`Context.hooks` attribute of the context. If ``None``,
+        the hooks of the context are left untouched.
+    duration : float
+        Time budget in seconds after which no more commands are run.
+    untilNodes : int
+        Number of nodes, as counted by the :attr:`Context.nodeCount`
+        attribute, after which no more commands are run. The run also stops
+        if the count doesn't change over 1024 commands in a row, such as when
+        the commands only run custom functions that don't increment it.
 
     Returns
     -------
     revl.Context
         The context after evaluating the commands.
 
+    Raises
+    ------
+    ValueError
+        None of the limits is defined, or the parameter ``flushEvery`` isn't
+        a positive number.
+
     Examples
     --------
     >>> import revl
@@ -371,21 +1882,147 @@ def run(commands, count, seed=None, context=None):
     ... ]
     >>> revl.run(commands, 100, seed=1.23)
     """
-    random.seed(seed)
+    if count is None and duration is None and untilNodes is None:
+        raise ValueError(
+            "At least one of the parameters 'count', 'duration', or "
+            "'untilNodes' is expected to be defined.")
+
+    _checkFlushEvery(flushEvery)
     commands = _consolidate(commands)
 
     if context is None:
         context = Context()
 
-    commands = [c for c in commands if c.weight > 0]
-    if commands:
-        for command in _pick(commands, count):
-            args = () if command.args is None else command.args
-            kwargs = {} if command.kwargs is None else command.kwargs
-            command.function(context, *args, **kwargs)
+    context.random.seed(seed)
+    context.stats = Stats(commands) if instrument else None
+    if hooks is not None:
+        context.hooks = list(hooks)
+
+    start = _clock()
+    table = _compile(commands)
+    if not any(c.weight > 0 for c in commands):
+        count = 0
+    else:
+        draw = _createSampler(commands, context.random, sampling)
+        if duration is None and untilNodes is None and flushEvery is None:
+            _evaluate(context, commands, table, draw(count), count,
+                      flushEvery)
+        else:
+            deadline = None if duration is None else start + duration
+            count = _evaluateUntil(context, commands, table, draw, count,
+                                   deadline, untilNodes, flushEvery)
+
+    _doIt(context)
+    context.summary = Summary(count=count, elapsed=_clock() - start)
+    return context
+
+
+def plan(commands, count, seed=None, sampling=Sampling.NUMPY, draws=2):
+    """Precompute the random choices of a run.
+
+    The resulting schedule can be replayed any number of times with the
+    :func:`execute` function to evaluate identical workloads without any
+    pseudo-random number generation happening in between the commands.
+
+    Parameters
+    ----------
+    commands : list of revl.Command or compatible tuple
+        Set of weighted commands.
+    count : int
+        Total number of commands to be run.
+    seed : object
+        Hashable object to define the starting seed of the pseudo-random
+        number generations. If ``None``, the current system time is used.
+    sampling : int
+        Strategy used to randomly pick the commands. Available values are
+        enumerated in the :class:`Sampling` class.
+    draws : int
+        Number of pseudo-random numbers to generate for each command, on
+        average. Once the numbers are exhausted, the commands draw from
+        a generator seeded from the schedule, which is slower but keeps the
+        replays identical.
+
+    Returns
+    -------
+    revl.Schedule
+        The schedule.
+    """
+    generator = random.Random(seed)
+    commands = _consolidate(commands)
+
+    indices = _pickIndices(commands, count, generator, sampling)
+    numpy = _getNumpy()
+    if numpy is None or not isinstance(indices, numpy.ndarray):
+        indices = array.array('l', indices)
+
+    valueCount = max(count * draws, 1)
+    if numpy is not None and sampling == Sampling.NUMPY:
+        values = _createNumpyGenerator(generator).random_sample(valueCount)
+    else:
+        uniform = generator.random
+        values = array.array('d', (uniform() for _ in _range(valueCount)))
+
+    return Schedule(indices=indices, values=values)
+
+
+def execute(schedule, commands, context=None, flushEvery=None,
+            instrument=False, hooks=None):
+    """Run the commands from a schedule.
+
+    Parameters
+    ----------
+    schedule : revl.Schedule
+        Schedule returned by the :func:`plan` function.
+    commands : list of revl.Command or compatible tuple
+        Set of weighted commands that was passed to :func:`plan`.
+    context : revl.Context
+        Context to use. If ``None``, a new one is created.
+    flushEvery : int
+        Number of commands to run before applying the pending operations with
+        :meth:`Context.flush`. If ``None``, the operations are only applied
+        once all the commands have been run.
+    instrument : bool
+        ``True`` to time each command and each application of the modifiers.
+        The statistics are then available in the :attr:`Context.stats`
+        attribute of the context returned.
+    hooks : list of revl.Hook
+        Observers to notify while running the commands, replacing the ones
+        from the :attr:`Context.hooks` attribute of the context. If ``None``,
+        the hooks of the context are left untouched.
+
+    Returns
+    -------
+    revl.Context
+        The context after evaluating the commands.
+
+    Raises
+    ------
+    ValueError
+        The parameter ``flushEvery`` isn't a positive number.
+    """
+    _checkFlushEvery(flushEvery)
+    commands = _consolidate(commands)
+    table = _compile(commands)
+
+    if context is None:
+        context = Context()
 
-    context.dag.doIt()
-    context.dg.doIt()
+    context.stats = Stats(commands) if instrument else None
+    if hooks is not None:
+        context.hooks = list(hooks)
+
+    start = _clock()
+    count = len(schedule.indices)
+    previous = context.random
+    context.random = _ReplayGenerator(schedule.values)
+    try:
+        _evaluate(context, commands, table, schedule.indices.tolist(), count,
+                  flushEvery)
+    finally:
+        context.random = previous
+
+    _doIt(context)
+    context.summary = Summary(count=count, elapsed=_clock() - start)
     return context
 
 
@@ -407,9 +2044,40 @@ def pickTransform(context):
         :attr:`Context.transforms` is empty.
     """
     if not context.transforms:
-        return NULL_OBJ
+        return context._binding.nullObj
+
+    count = len(context.transforms)
+    return context.transforms[int(context.random.random() * count)]
+
+
+def pickNode(context, type):
+    """Pick a random node of a given type.
+
+    Only the nodes registered in :attr:`Context.nodes` are considered, that
+    is the ones created by the command functions of this module while the
+    context was tracking the nodes.
 
-    return context.transforms[random.randint(0, len(context.transforms) - 1)]
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    type : maya.OpenMaya.MTypeId or str
+        Type of the node to pick, as passed when creating it.
+
+    Returns
+    -------
+    maya.OpenMaya.MObject
+        The node object picked, or :const:`NULL_OBJ` if no node of that type
+        could be found.
+
+    Raises
+    ------
+    ValueError
+        The context doesn't track the nodes.
+    """
+    _checkTracking(context)
+    node = context.nodes.pick(type, context.random)
+    return context._binding.nullObj if node is None else node
 
 
 def createDagNode(context, type, parent=False):
@@ -440,13 +2108,23 @@ def createDagNode(context, type, parent=False):
     """
     if parent:
         oParent = pickTransform(context)
-        if oParent is NULL_OBJ:
-            return NULL_OBJ
+        if oParent is context._binding.nullObj:
+            return oParent
     else:
         oParent = context.dag.createNode('transform')
         context.transforms.append(oParent)
+        if context.trackNodes:
+            context.nodes.add('transform', oParent)
+            context.hierarchy.add(oParent)
+
+        context.nodeCount += 1
 
-    return context.dag.createNode(type, oParent)
+    oNode = context.dag.createNode(type, oParent)
+    if context.trackNodes:
+        context.nodes.add(type, oNode)
+
+    context.nodeCount += 1
+    return oNode
 
 
 def createDgNode(context, type):
@@ -468,11 +2146,47 @@ def createDgNode(context, type):
     maya.OpenMaya.MObject
         The new node object.
     """
-    return context.dg.createNode(type)
+    oNode = context.dg.createNode(type)
+    if context.trackNodes:
+        context.nodes.add(type, oNode)
 
+    context.nodeCount += 1
+    return oNode
 
-def createPrimitive(context, type=None, name=None, parent=False,
-                    forceTransformCreation=True):
+
+def createDgNodes(context, type, count):
+    """Create several DG nodes of a same type.
+
+    This is equivalent to calling :func:`createDgNode` a given number of
+    times, while saving on the overhead of running as many commands.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    type : maya.OpenMaya.MTypeId or str
+        Type of the nodes to create, for example: 'addDoubleLinear', 'bevel',
+        'clamp', 'lambert', and so on.
+    count : int
+        Number of nodes to create.
+
+    Returns
+    -------
+    list of maya.OpenMaya.MObject
+        The new node objects.
+    """
+    createNode = context.dg.createNode
+    oNodes = [createNode(type) for _ in _range(count)]
+    if context.trackNodes:
+        context.nodes.extend(type, oNodes)
+
+    context.nodeCount += count
+    return oNodes
+
+
+def createPrimitive(context, type=None, name=None, parent=False,
+                    forceTransformCreation=True, policy=None,
+                    shareGenerator=False):
     """Create a geometry primitive.
 
     Parameters
@@ -485,7 +2199,8 @@ def createPrimitive(context, type=None, name=None, parent=False,
         picked.
     name : str
         Base name for the new transform node. If ``None``, no name is
-        explicitely set.
+        explicitely set. The renaming is queued in the DAG modifier, along
+        with the creation of the nodes.
     parent : bool
         ``True`` to parent the new transform under another transform randomly
         picked from the scene, if any. Otherwise it is parented under the
@@ -495,6 +2210,15 @@ def createPrimitive(context, type=None, name=None, parent=False,
         otherwise a new transform is created only if the parameter ``parent``
         is ``False`` or if no transform could be found in the scene to parent
         the shapes to.
+    policy : revl.HierarchyPolicy
+        Constraints on the transform picked as parent when the parameter
+        ``parent`` is ``True``. If ``None``, the parent is uniformly picked
+        among all the transforms of the scene. A policy requires the
+        context to track the nodes.
+    shareGenerator : bool
+        ``True`` to connect the shapes to the generator node stored for the
+        primitive type in the :attr:`Context.generators` attribute, creating
+        it only if needed, rather than to a new generator node.
 
     Returns
     -------
@@ -503,34 +2227,174 @@ def createPrimitive(context, type=None, name=None, parent=False,
         shapes.
     """
     if type is None:
-        type = random.randint(PrimitiveType._FIRST, PrimitiveType._LAST)
+        count = PrimitiveType._LAST - PrimitiveType._FIRST + 1
+        type = PrimitiveType._FIRST + int(context.random.random() * count)
 
-    oParent = pickTransform(context) if parent else NULL_OBJ
-    if forceTransformCreation or oParent is NULL_OBJ:
+    nullObj = context._binding.nullObj
+    oParent = _pickParent(context, policy) if parent else nullObj
+    if forceTransformCreation or oParent is nullObj:
         oTransform = context.dag.createNode('transform', oParent)
         context.transforms.append(oTransform)
+        if context.trackNodes:
+            context.nodes.add('transform', oTransform)
+            context.hierarchy.add(oTransform,
+                                  context.hierarchy.find(oParent))
+
+        context.nodeCount += 1
     else:
         oTransform = oParent
 
     traits = _PRIMITIVE_TRAITS[type]
-    oGenerator = context.dg.createNode(traits.type)
-    generator = OpenMaya.MFnDependencyNode(oGenerator)
+    attributes = _getPrimitiveAttributes(context._binding, type)
+    oGenerator = context.generators.get(type) if shareGenerator else None
+    if oGenerator is None:
+        oGenerator = context.dg.createNode(traits.type)
+        if context.trackNodes:
+            context.nodes.add(traits.type, oGenerator)
+
+        context.nodeCount += 1
+        if shareGenerator:
+            context.generators[type] = oGenerator
 
     shapes = []
-    for outPlug in traits.outPlugs:
+    for oOutAttr in attributes.outPlugs:
         oShape = context.dag.createNode(traits.shapeType, oTransform)
-        shape = OpenMaya.MFnDagNode(oShape)
-        context.dg.connect(generator.findPlug(outPlug),
-                           shape.findPlug(traits.inPlug))
+        context.dg.connect(oGenerator, oOutAttr, oShape, attributes.inPlug)
         shapes.append(oShape)
 
+    if context.trackNodes:
+        context.nodes.extend(traits.shapeType, shapes)
+
+    context.nodeCount += len(shapes)
+
     if name is not None:
-        OpenMaya.MFnDagNode(oTransform).setName(name)
+        context.dag.renameNode(oTransform, name)
 
     return Primitive(generator=oGenerator, transform=oTransform, shapes=shapes)
 
 
-def createTransform(context, name=None, parent=False):
+def createPrimitives(context, count, type=None, name=None, parent=False,
+                     forceTransformCreation=True, policy=None,
+                     shareGenerator=False):
+    """Create several geometry primitives.
+
+    This is equivalent to calling :func:`createPrimitive` a given number of
+    times, while saving on the overhead of running as many commands.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    count : int
+        Number of primitives to create.
+    type : int
+        Primitive type. Available values are enumerated in the
+        :class:`PrimitiveType` class. If ``None``, a primitive type is randomly
+        picked for each primitive.
+    name : str
+        Base name for the new transform nodes. If ``None``, no name is
+        explicitely set. The renaming is queued in the DAG modifier, along
+        with the creation of the nodes.
+    parent : bool
+        ``True`` to parent each new transform under another transform randomly
+        picked from the scene, if any. Otherwise they are parented under the
+        world.
+    forceTransformCreation : bool
+        ``True`` to always create a new transform with the shapes as child,
+        otherwise a new transform is created only if the parameter ``parent``
+        is ``False`` or if no transform could be found in the scene to parent
+        the shapes to.
+    policy : revl.HierarchyPolicy
+        Constraints on the transforms picked as parent when the parameter
+        ``parent`` is ``True``. If ``None``, the parents are uniformly picked
+        among all the transforms of the scene. A policy requires the
+        context to track the nodes.
+    shareGenerator : bool
+        ``True`` to connect the shapes to the generator node stored for each
+        primitive type in the :attr:`Context.generators` attribute, creating
+        it only if needed, rather than to new generator nodes.
+
+    Returns
+    -------
+    list of revl.Primitive
+        The new primitives.
+    """
+    binding = context._binding
+    nullObj = binding.nullObj
+    createDagNode = context.dag.createNode
+    createDgNode = context.dg.createNode
+    connect = context.dg.connect
+    renameNode = context.dag.renameNode
+    generate = context.random.random
+    trackNodes = context.trackNodes
+    hierarchy = context.hierarchy
+    transforms = context.transforms
+    generators = context.generators
+    typeCount = PrimitiveType._LAST - PrimitiveType._FIRST + 1
+    if type is not None:
+        traits = _PRIMITIVE_TRAITS[type]
+        attributes = _getPrimitiveAttributes(binding, type)
+
+    # The nodes are registered by type once all the primitives are created,
+    # apart from the transforms added to the hierarchy, which need to be
+    # available right away as a parent for the next primitives.
+    oNodes = collections.defaultdict(list)
+    nodeCount = 0
+    primitives = []
+    for _ in _range(count):
+        primitiveType = type
+        if primitiveType is None:
+            primitiveType = PrimitiveType._FIRST + int(generate() * typeCount)
+            traits = _PRIMITIVE_TRAITS[primitiveType]
+            attributes = _getPrimitiveAttributes(binding, primitiveType)
+
+        oParent = _pickParent(context, policy) if parent else nullObj
+        if forceTransformCreation or oParent is nullObj:
+            oTransform = createDagNode('transform', oParent)
+            transforms.append(oTransform)
+            if trackNodes:
+                oNodes['transform'].append(oTransform)
+                hierarchy.add(oTransform, hierarchy.find(oParent))
+
+            nodeCount += 1
+        else:
+            oTransform = oParent
+
+        oGenerator = generators.get(primitiveType) if shareGenerator else None
+        if oGenerator is None:
+            oGenerator = createDgNode(traits.type)
+            if trackNodes:
+                oNodes[traits.type].append(oGenerator)
+
+            nodeCount += 1
+            if shareGenerator:
+                generators[primitiveType] = oGenerator
+
+        shapes = []
+        for oOutAttr in attributes.outPlugs:
+            oShape = createDagNode(traits.shapeType, oTransform)
+            connect(oGenerator, oOutAttr, oShape, attributes.inPlug)
+            shapes.append(oShape)
+
+        if trackNodes:
+            oNodes[traits.shapeType].extend(shapes)
+
+        nodeCount += len(shapes)
+
+        if name is not None:
+            renameNode(oTransform, name)
+
+        primitives.append(Primitive(generator=oGenerator,
+                                    transform=oTransform, shapes=shapes))
+
+    for nodeType, oTypeNodes in _iteritems(oNodes):
+        context.nodes.extend(nodeType, oTypeNodes)
+
+    context.nodeCount += nodeCount
+    return primitives
+
+
+def createTransform(context, name=None, parent=False, policy=None):
     """Create a transform node.
 
     Parameters
@@ -539,25 +2403,107 @@ def createTransform(context, name=None, parent=False):
         Command context.
     name : str
         Name of the new transform node. If ``None``, the default name is used.
+        The renaming is queued in the DAG modifier, along with the creation
+        of the node.
     parent : bool
         ``True`` to parent the new transform under another transform randomly
         picked from the scene, if any. Otherwise it is parented under the
         world.
+    policy : revl.HierarchyPolicy
+        Constraints on the transform picked as parent when the parameter
+        ``parent`` is ``True``. If ``None``, the parent is uniformly picked
+        among all the transforms of the scene. A policy requires the
+        context to track the nodes.
 
     Returns
     -------
     maya.OpenMaya.MObject
         The new transform object.
     """
-    oParent = pickTransform(context) if parent else NULL_OBJ
+    if parent:
+        oParent = _pickParent(context, policy)
+    else:
+        oParent = context._binding.nullObj
+
     oTransform = context.dag.createNode('transform', oParent)
     if name is not None:
-        OpenMaya.MFnDagNode(oTransform).setName(name)
+        context.dag.renameNode(oTransform, name)
 
     context.transforms.append(oTransform)
+    if context.trackNodes:
+        context.nodes.add('transform', oTransform)
+        context.hierarchy.add(oTransform, context.hierarchy.find(oParent))
+
+    context.nodeCount += 1
     return oTransform
 
 
+def createTransforms(context, count, name=None, parent=False, policy=None):
+    """Create several transform nodes.
+
+    This is equivalent to calling :func:`createTransform` a given number of
+    times, while saving on the overhead of running as many commands.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    count : int
+        Number of transform nodes to create.
+    name : str
+        Name of the new transform nodes. If ``None``, the default name is
+        used. The renaming is queued in the DAG modifier, along with the
+        creation of the nodes.
+    parent : bool
+        ``True`` to parent each new transform under another transform randomly
+        picked from the scene, if any, including the ones created by this
+        call. Otherwise they are parented under the world.
+    policy : revl.HierarchyPolicy
+        Constraints on the transforms picked as parent when the parameter
+        ``parent`` is ``True``. If ``None``, the parents are uniformly picked
+        among all the transforms of the scene. A policy requires the
+        context to track the nodes.
+
+    Returns
+    -------
+    list of maya.OpenMaya.MObject
+        The new transform objects.
+    """
+    createNode = context.dag.createNode
+    trackNodes = context.trackNodes
+    hierarchy = context.hierarchy
+    if parent:
+        # Each transform needs to be registered right away to be available
+        # as a parent for the next ones.
+        transforms = context.transforms
+        oTransforms = []
+        for _ in _range(count):
+            oParent = _pickParent(context, policy)
+            oTransform = createNode('transform', oParent)
+            transforms.append(oTransform)
+            if trackNodes:
+                hierarchy.add(oTransform, hierarchy.find(oParent))
+
+            oTransforms.append(oTransform)
+    else:
+        oTransforms = [createNode('transform') for _ in _range(count)]
+        context.transforms.extend(oTransforms)
+        if trackNodes:
+            for oTransform in oTransforms:
+                hierarchy.add(oTransform)
+
+    if name is not None:
+        renameNode = context.dag.renameNode
+        for oTransform in oTransforms:
+            renameNode(oTransform, name)
+
+    if trackNodes:
+        context.nodes.extend('transform', oTransforms)
+
+    context.nodeCount += count
+    return oTransforms
+
+
 def unparent(context):
     """Unparent a random transform node.
 
@@ -566,11 +2512,272 @@ def unparent(context):
     context : revl.Context
         Command context.
     """
+    nullObj = context._binding.nullObj
     oNode = pickTransform(context)
-    if oNode is NULL_OBJ:
+    if oNode is nullObj:
+        return
+
+    context.dag.reparentNode(oNode, nullObj)
+    if context.trackNodes:
+        index = context.hierarchy.find(oNode)
+        if index >= 0:
+            context.hierarchy.setParent(index, -1)
+
+
+def reparent(context):
+    """Reparent a random transform node under another one.
+
+    Both transforms are picked from the hierarchy of the context, with the
+    new parent never being a descendant of the transform reparented, to
+    avoid creating cycles.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+
+    Raises
+    ------
+    ValueError
+        The context doesn't track the nodes.
+    """
+    _checkTracking(context)
+    hierarchy = context.hierarchy
+    index = hierarchy.pick(context.random)
+    if index < 0:
+        return
+
+    parent = hierarchy.pickNonDescendant(index, context.random)
+    if parent < 0:
         return
 
-    context.dag.reparentNode(oNode, NULL_OBJ)
+    context.dag.reparentNode(hierarchy.nodes[index], hierarchy.nodes[parent])
+    hierarchy.setParent(index, parent)
+
+
+def _pickParent(context, policy):
+    """Pick a random transform node to parent a new transform to.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    policy : revl.HierarchyPolicy
+        Constraints on the transform picked. If ``None``, the transform is
+        picked with :func:`pickTransform`.
+
+    Returns
+    -------
+    maya.OpenMaya.MObject
+        The transform object picked, or :const:`NULL_OBJ` if no transform
+        could be found.
+
+    Raises
+    ------
+    ValueError
+        A policy is given but the context doesn't track the nodes.
+    """
+    if policy is None:
+        return pickTransform(context)
+
+    _checkTracking(context)
+    index = context.hierarchy.pickParent(policy, context.random)
+    if index < 0:
+        return context._binding.nullObj
+
+    return context.hierarchy.nodes[index]
+
+
+def _getTypeKey(type):
+    """Retrieve a hashable key for a node type.
+
+    Parameters
+    ----------
+    type : maya.OpenMaya.MTypeId or str
+        Node type.
+
+    Returns
+    -------
+    int or str
+        The identifier of the node type, or its name.
+    """
+    if isinstance(type, _STRING_TYPES):
+        return type
+
+    try:
+        return type.id()
+    except AttributeError:
+        return type
+
+
+def _checkTracking(context):
+    """Check that a context tracks the nodes created.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+
+    Raises
+    ------
+    ValueError
+        The context doesn't track the nodes.
+    """
+    if not context.trackNodes:
+        raise ValueError(
+            "The context is expected to track the nodes, as enabled by its "
+            "'trackNodes' attribute.")
+
+
+class _UncacheableError(Exception):
+    """Raised when a value can't be part of a fingerprint."""
+
+
+def _isPristine(context):
+    """Check whether a context is yet to create any node.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+
+    Returns
+    -------
+    bool
+        ``True`` if the context didn't create any node.
+    """
+    return not (context.nodeCount or context.transforms or context.nodes
+                or context.hierarchy or context.generators)
+
+
+def _fingerprint(value):
+    """Compute a fingerprint that is stable across sessions.
+
+    Parameters
+    ----------
+    value : object
+        Value to fingerprint.
+
+    Returns
+    -------
+    str
+        The fingerprint, or ``None`` if the value isn't hashable or can't be
+        reliably identified across sessions.
+    """
+    try:
+        hash(value)
+        description = repr(_describe(value))
+    except (TypeError, _UncacheableError):
+        return None
+
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+
+def _describe(value):
+    """Describe a value with built-in types having a stable representation.
+
+    Parameters
+    ----------
+    value : object
+        Value to describe.
+
+    Returns
+    -------
+    object
+        The description.
+
+    Raises
+    ------
+    revl._UncacheableError
+        The value can't be reliably identified across sessions.
+    """
+    if value is None or isinstance(value, (numbers.Number,) + _STRING_TYPES):
+        return value
+
+    if isinstance(value, tuple):
+        return (_getQualifiedName(type(value)),
+                tuple(_describe(item) for item in value))
+
+    if isinstance(value, _CLASS_TYPES):
+        return _getQualifiedName(value)
+
+    if isinstance(value, _FUNCTION_TYPES):
+        # Bound methods are only identified by their name when bound to
+        # a class or to a module, as with class methods and built-ins.
+        owner = getattr(value, '__self__', None)
+        if (owner is None
+                or isinstance(owner, _CLASS_TYPES + (types.ModuleType,))):
+            return _getQualifiedName(value)
+
+    raise _UncacheableError()
+
+
+def _getQualifiedName(obj):
+    """Retrieve the qualified name of a function or of a class.
+
+    Parameters
+    ----------
+    obj : function or type
+        Function or class.
+
+    Returns
+    -------
+    str
+        The qualified name.
+
+    Raises
+    ------
+    revl._UncacheableError
+        The object can't be retrieved from its qualified name.
+    """
+    # Methods are named after the class that they are retrieved from, which
+    # is where class methods are bound to, rather than where they are
+    # defined. Unbound methods only exist in Python 2.
+    owner = getattr(obj, '__self__', None)
+    if owner is None:
+        owner = getattr(obj, 'im_class', None)
+
+    if isinstance(owner, _CLASS_TYPES):
+        name = obj.__name__
+        if getattr(owner, name, None) != obj:
+            raise _UncacheableError()
+
+        return '%s.%s' % (_getQualifiedName(owner), name)
+
+    # Python 2 doesn't provide qualified names, so the object is looked up
+    # from its module to make sure that the name identifies it.
+    name = getattr(obj, '__qualname__', getattr(obj, '__name__', None))
+    module = getattr(obj, '__module__', None)
+    if name is None or module is None:
+        raise _UncacheableError()
+
+    resolved = sys.modules.get(module)
+    for part in name.split('.'):
+        resolved = getattr(resolved, part, None)
+
+    if resolved is not obj:
+        raise _UncacheableError()
+
+    return '%s.%s' % (module, name)
+
+
+def _checkFlushEvery(flushEvery):
+    """Check the number of commands to run between two flushes.
+
+    Parameters
+    ----------
+    flushEvery : int
+        Number of commands, or ``None``.
+
+    Raises
+    ------
+    ValueError
+        The number of commands isn't positive.
+    """
+    if flushEvery is not None and flushEvery <= 0:
+        raise ValueError(
+            "The parameter 'flushEvery' is expected to be a positive number, "
+            "not '%s'." % (flushEvery,))
 
 
 def _consolidate(commands):
@@ -589,32 +2796,980 @@ def _consolidate(commands):
     return [Command(*c) for c in commands]
 
 
-def _pick(commands, count):
-    """Randomly pick commands from a set a given number of times.
+def _compile(commands):
+    """Convert commands into functions ready to be called.
+
+    Each function only expects the command context as argument, which removes
+    the need to normalize and to unpack the arguments of the commands each
+    time they are run.
 
     Parameters
     ----------
     commands : list of revl.Command
-        Set of weighted commands available for picking.
-    count : int
-        Total number of commands to pick.
+        Commands.
 
-    Yields
-    ------
-    revl.Command
-        The command picked.
+    Returns
+    -------
+    list of function
+        The compiled commands.
     """
-    # Credits: Ned Batchelder for his answer on StackOverflow at
-    # http://stackoverflow.com/a/3679747/1640404.
-    total = sum(c.weight for c in commands)
-    for _ in _range(count):
-        r = random.uniform(0, total)
-        v = 0
-        for command in commands:
-            v += command.weight
-            if v >= r:
-                yield command
-                break
+    out = []
+    for command in commands:
+        if command.args:
+            out.append(_bind(command.function, command.args,
+                             {} if command.kwargs is None else command.kwargs))
+        elif command.kwargs:
+            out.append(functools.partial(command.function, **command.kwargs))
+        else:
+            out.append(command.function)
+
+    return out
+
+
+def _bind(function, args, kwargs):
+    """Bind positional and keyword arguments after the context one.
+
+    Parameters
+    ----------
+    function : function
+        Command function.
+    args : tuple
+        Additional arguments to pass to the function.
+    kwargs : dict
+        Keyword arguments to pass to the function.
+
+    Returns
+    -------
+    function
+        The function only expecting the command context as argument.
+    """
+    def call(context):
+        return function(context, *args, **kwargs)
+
+    return call
+
+
+def _evaluate(context, commands, table, indices, count, flushEvery, step=0):
+    """Run a sequence of compiled commands.
+
+    The loop running the commands is picked depending on whether the context
+    requires the commands to be timed or observed, so that a plain run does
+    not pay for these features.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    commands : list of revl.Command
+        Set of commands.
+    table : list of function
+        Compiled commands, in the same order as the set of commands.
+    indices : iterable of int
+        Index of each command to run, in order.
+    count : int
+        Total number of commands to run.
+    flushEvery : int
+        Number of commands to run before flushing the context. If ``None``,
+        the context is never flushed.
+    step : int
+        Number of commands run before this sequence. The context is flushed
+        each time that the number of commands run reaches a multiple of
+        ``flushEvery``.
+    """
+    if context.hooks:
+        runCommands = _runCommandsHooked
+    elif context.stats is not None:
+        runCommands = _runCommandsInstrumented
+    else:
+        runCommands = _runCommands
+
+    if flushEvery is None:
+        runCommands(context, commands, table, indices, step)
+        return
+
+    iterator = iter(indices)
+    stop = step + count
+    while step < stop:
+        offset = step % flushEvery
+        if step and not offset:
+            context.flush()
+
+        size = min(flushEvery - offset, stop - step)
+        runCommands(context, commands, table,
+                    itertools.islice(iterator, size), step)
+        step += size
+
+
+def _evaluateUntil(context, commands, table, draw, count, deadline,
+                   nodeCount, flushEvery):
+    """Randomly run commands in batches until a limit is reached.
+
+    The limits are checked between each batch of commands to keep the cost
+    of the checks negligible.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    commands : list of revl.Command
+        Set of weighted commands.
+    table : list of function
+        Compiled commands, in the same order as the set of commands.
+    draw : function
+        Sampler returned by :func:`_createSampler`, drawing the index of the
+        commands to run.
+    count : int
+        Maximum number of commands to run, or ``None``.
+    deadline : float
+        Time, as returned by the clock, after which no more commands are run,
+        or ``None``.
+    nodeCount : int
+        Number of nodes from the context after which no more commands are
+        run, or ``None``.
+    flushEvery : int
+        Number of commands to run before flushing the context. If ``None``,
+        the context is never flushed.
+
+    Returns
+    -------
+    int
+        The number of commands run.
+    """
+    start = _clock()
+    initialNodeCount = context.nodeCount
+    stalled = 0
+    step = 0
+    size = 0
+    while count is None or step < count:
+        previousSize = size
+        size = _BATCH_SIZE
+        if count is not None:
+            size = min(size, count - step)
+
+        if deadline is not None:
+            now = _clock()
+            if now >= deadline:
+                break
+
+            # Size the batches to last about a tenth of the remaining time,
+            # based on the average time taken by each command so far. Since
+            # that average is unknown at first and might be off while only
+            # a few commands were run, the batches start with a single
+            # command and at most double in size from one to the next.
+            elapsed = now - start
+            if step and elapsed > 0.0:
+                estimate = int(step * (deadline - now) / (10.0 * elapsed))
+                size = min(size, max(estimate, 1))
+
+            size = min(size, max(2 * previousSize, 1))
+
+        if nodeCount is not None:
+            remaining = nodeCount - context.nodeCount
+            if remaining <= 0 or stalled >= _BATCH_SIZE:
+                break
+
+            # Shrink the batches while closing in on the target, based on
+            # twice the average number of nodes created by each command so
+            # far. The target is then only exceeded by the last command, as
+            # long as no command creates more than twice that average.
+            created = context.nodeCount - initialNodeCount
+            ratio = max(2.0 * created / step, 1.0) if step else 1.0
+            size = min(size, max(int(remaining / ratio), 1))
+
+        previousNodeCount = context.nodeCount
+        _evaluate(context, commands, table, draw(size), size, flushEvery,
+                  step)
+        step += size
+        if context.nodeCount == previousNodeCount:
+            stalled += size
+        else:
+            stalled = 0
+
+    return step
+
+
+def _runCommands(context, commands, table, indices, step):
+    """Run a sequence of compiled commands.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    commands : list of revl.Command
+        Set of commands.
+    table : list of function
+        Compiled commands, in the same order as the set of commands.
+    indices : iterable of int
+        Index of each command to run, in order.
+    step : int
+        Number of commands run before this sequence.
+    """
+    for i in indices:
+        table[i](context)
+
+
+def _runCommandsInstrumented(context, commands, table, indices, step):
+    """Run a sequence of compiled commands while timing them.
+
+    The timings are accumulated into the statistics of the context.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    commands : list of revl.Command
+        Set of commands.
+    table : list of function
+        Compiled commands, in the same order as the set of commands.
+    indices : iterable of int
+        Index of each command to run, in order.
+    step : int
+        Number of commands run before this sequence.
+    """
+    clock = _clock
+    records = [entry._record for entry in context.stats.commands]
+    for i in indices:
+        start = clock()
+        table[i](context)
+        records[i](clock() - start)
+
+
+def _runCommandsHooked(context, commands, table, indices, step):
+    """Run a sequence of compiled commands while notifying the hooks.
+
+    If the context requires the commands to be timed, the timings are
+    measured by the innermost hook and accumulated into the statistics of
+    the context.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    commands : list of revl.Command
+        Set of commands.
+    table : list of function
+        Compiled commands, in the same order as the set of commands.
+    indices : iterable of int
+        Index of each command to run, in order.
+    step : int
+        Number of commands run before this sequence.
+    """
+    hooks = list(context.hooks)
+    if context.stats is not None:
+        hooks.append(_StatsHook(context.stats))
+
+    befores = [hook.beforeCommand for hook in hooks]
+    afters = [hook.afterCommand for hook in reversed(hooks)]
+    for step, i in enumerate(indices, step):
+        command = commands[i]
+        for before in befores:
+            before(context, i, command, step)
+
+        table[i](context)
+
+        for after in afters:
+            after(context, i, command, step)
+
+
+def _doIt(context):
+    """Apply the pending operations of the modifiers from a context.
+
+    The DAG modifier is applied before the DG one. The durations are
+    accumulated into the statistics of the context, if any, and the hooks
+    of the context are notified around each application.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    """
+    stats = context.stats
+    if stats is None and not context.hooks:
+        context.dag.doIt()
+        context.dg.doIt()
+        return
+
+    dagDoIt = _applyModifier(context, context.dag)
+    dgDoIt = _applyModifier(context, context.dg)
+    if stats is not None:
+        stats.dagDoIt += dagDoIt
+        stats.dgDoIt += dgDoIt
+
+
+def _applyModifier(context, modifier):
+    """Apply the pending operations of a modifier while notifying the hooks.
+
+    Parameters
+    ----------
+    context : revl.Context
+        Command context.
+    modifier : maya.OpenMaya.MDGModifier
+        Modifier.
+
+    Returns
+    -------
+    float
+        The time spent applying the operations, in seconds.
+    """
+    hooks = context.hooks
+    for hook in hooks:
+        hook.beforeDoIt(context, modifier)
+
+    start = _clock()
+    modifier.doIt()
+    elapsed = _clock() - start
+
+    for hook in reversed(hooks):
+        hook.afterDoIt(context, modifier)
+
+    return elapsed
+
+
+class _ReplayGenerator(object):
+    """Generator replaying a precomputed sequence of pseudo-random numbers.
+
+    Once the sequence is exhausted, the numbers are drawn from a generator
+    seeded from the last number of the sequence, rather than starting over
+    and making the workload periodic.
+
+    Attributes
+    ----------
+    random : function
+        Return the next number from the sequence.
+    """
+
+    def __init__(self, values):
+        """Constructor.
+
+        Parameters
+        ----------
+        values : array of float
+            Sequence of pseudo-random numbers to replay.
+        """
+        values = values.tolist()
+        seed = int(values[-1] * 2 ** 53) if values else 0
+        self.random = functools.partial(
+            next, itertools.chain(values, _generateRandom(seed)))
+
+
+def _generateRandom(seed):
+    """Generate pseudo-random numbers endlessly.
+
+    Parameters
+    ----------
+    seed : int
+        Seed of the pseudo-random number generations.
+
+    Yields
+    ------
+    float
+        The next number, in the range [0.0, 1.0).
+    """
+    uniform = random.Random(seed).random
+    while True:
+        yield uniform()
+
+
+def _pick(commands, count, generator, sampling=Sampling.NUMPY):
+    """Randomly pick commands from a set a given number of times.
+
+    Parameters
+    ----------
+    commands : list of revl.Command
+        Set of weighted commands available for picking.
+    count : int
+        Total number of commands to pick.
+    generator : random.Random
+        Pseudo-random number generator.
+    sampling : int
+        Strategy used to pick the commands. Available values are enumerated
+        in the :class:`Sampling` class.
+
+    Yields
+    ------
+    revl.Command
+        The command picked.
+    """
+    for i in _sample([c.weight for c in commands], count, generator,
+                     sampling):
+        yield commands[i]
+
+
+def _pickIndices(commands, count, generator, sampling):
+    """Randomly pick the index of commands from a set.
+
+    Commands with a weight lesser than or equal to zero are never picked.
+
+    Parameters
+    ----------
+    commands : list of revl.Command
+        Set of weighted commands.
+    count : int
+        Total number of indices to pick.
+    generator : random.Random
+        Pseudo-random number generator.
+    sampling : int
+        Strategy used to pick the indices. Available values are enumerated
+        in the :class:`Sampling` class.
+
+    Returns
+    -------
+    numpy.ndarray or iterable of int
+        The indices picked, within the set of commands.
+    """
+    positions = [i for i, c in enumerate(commands) if c.weight > 0]
+    if not positions:
+        return []
+
+    weights = [commands[i].weight for i in positions]
+    indices = _SAMPLERS[sampling](weights, count, generator)
+    if len(positions) == len(commands):
+        return indices
+
+    numpy = _getNumpy()
+    if numpy is not None and isinstance(indices, numpy.ndarray):
+        return numpy.take(positions, indices)
+
+    return (positions[i] for i in indices)
+
+
+def _createSampler(commands, generator, sampling):
+    """Prepare the random picking of command indices for a whole run.
+
+    The tables and generators required by the sampling strategy are set up
+    once, so that drawing the indices in several batches is as cheap as, and
+    yields the same sequence as, drawing them all at once.
+
+    Parameters
+    ----------
+    commands : list of revl.Command
+        Set of weighted commands, with at least one positive weight.
+    generator : random.Random
+        Pseudo-random number generator.
+    sampling : int
+        Strategy used to pick the indices. Available values are enumerated
+        in the :class:`Sampling` class.
+
+    Returns
+    -------
+    function
+        Function expecting the number of indices to draw next and returning
+        them as a plain iterable of int, within the set of commands.
+    """
+    positions = [i for i, c in enumerate(commands) if c.weight > 0]
+    weights = [commands[i].weight for i in positions]
+    if len(positions) == len(commands):
+        positions = None
+
+    numpy = _getNumpy()
+    if numpy is not None and sampling == Sampling.NUMPY:
+        cumulative = numpy.cumsum(weights, dtype=numpy.float64)
+        total = cumulative[-1]
+        last = len(weights) - 1
+        numpyGenerator = _createNumpyGenerator(generator)
+
+        def drawVectorized(count):
+            values = numpyGenerator.random_sample(count)
+            values *= total
+            indices = numpy.searchsorted(cumulative, values, side='right')
+
+            # Clamp the indices to guard against floating-point rounding
+            # errors.
+            numpy.minimum(indices, last, out=indices)
+            if positions is not None:
+                indices = numpy.take(positions, indices)
+
+            return indices.tolist()
+
+        return drawVectorized
+
+    indices = _SAMPLERS[sampling](weights, None, generator)
+    if positions is not None:
+        indices = (positions[i] for i in indices)
+
+    def draw(count):
+        return itertools.islice(indices, count)
+
+    return draw
+
+
+def _sample(weights, count, generator, sampling):
+    """Randomly pick indices using a given strategy.
+
+    Parameters
+    ----------
+    weights : list of float
+        Positive weights.
+    count : int
+        Total number of indices to pick.
+    generator : random.Random
+        Pseudo-random number generator.
+    sampling : int
+        Strategy used to pick the indices. Available values are enumerated
+        in the :class:`Sampling` class.
+
+    Returns
+    -------
+    iterable of int
+        The indices picked.
+    """
+    indices = _SAMPLERS[sampling](weights, count, generator)
+    numpy = _getNumpy()
+    if numpy is not None and isinstance(indices, numpy.ndarray):
+        return indices.tolist()
+
+    return indices
+
+
+def _sampleLinear(weights, count, generator):
+    """Randomly pick indices by walking through the weights.
+
+    Parameters
+    ----------
+    weights : list of float
+        Positive weights.
+    count : int
+        Total number of indices to pick, or ``None`` to pick them
+        indefinitely.
+    generator : random.Random
+        Pseudo-random number generator.
+
+    Yields
+    ------
+    int
+        The index picked.
+    """
+    # Credits: Ned Batchelder for his answer on StackOverflow at
+    # http://stackoverflow.com/a/3679747/1640404.
+    total = sum(weights)
+    for _ in _iterateSteps(count):
+        r = generator.random() * total
+        v = 0
+        for i, weight in enumerate(weights):
+            v += weight
+            if v >= r:
+                yield i
+                break
+
+
+def _sampleBisect(weights, count, generator):
+    """Randomly pick indices by bisecting the cumulative weights.
+
+    Parameters
+    ----------
+    weights : list of float
+        Positive weights.
+    count : int
+        Total number of indices to pick, or ``None`` to pick them
+        indefinitely.
+    generator : random.Random
+        Pseudo-random number generator.
+
+    Yields
+    ------
+    int
+        The index picked.
+    """
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    last = len(weights) - 1
+    bisectRight = bisect.bisect_right
+    uniform = generator.random
+    for _ in _iterateSteps(count):
+        # Clamp the index to guard against floating-point rounding errors.
+        yield min(bisectRight(cumulative, uniform() * total), last)
+
+
+def _sampleAlias(weights, count, generator):
+    """Randomly pick indices by looking up an alias table.
+
+    Parameters
+    ----------
+    weights : list of float
+        Positive weights.
+    count : int
+        Total number of indices to pick, or ``None`` to pick them
+        indefinitely.
+    generator : random.Random
+        Pseudo-random number generator.
+
+    Yields
+    ------
+    int
+        The index picked.
+    """
+    size = len(weights)
+    probabilities, aliases = _buildAliasTable(weights)
+    uniform = generator.random
+    for _ in _iterateSteps(count):
+        # The integral part of the number picks a column of the table while
+        # its fractional part decides whether to use the alias or not.
+        r = uniform() * size
+        i = int(r)
+        yield i if r - i < probabilities[i] else aliases[i]
+
+
+def _buildAliasTable(weights):
+    """Build an alias table using Vose's method.
+
+    Parameters
+    ----------
+    weights : list of float
+        Positive weights.
+
+    Returns
+    -------
+    tuple
+        The probabilities and the aliases for each column of the table.
+    """
+    # Credits: Keith Schwarz for his article 'Darts, Dice, and Coins: Sampling
+    # from a Discrete Distribution' at
+    # http://www.keithschwarz.com/darts-dice-coins.
+    size = len(weights)
+    total = float(sum(weights))
+    probabilities = [weight * size / total for weight in weights]
+    aliases = list(_range(size))
+    small = [i for i, p in enumerate(probabilities) if p < 1.0]
+    large = [i for i, p in enumerate(probabilities) if p >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        aliases[less] = more
+        probabilities[more] += probabilities[less] - 1.0
+        if probabilities[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    # Whatever is left is only due to floating-point rounding errors.
+    for i in small + large:
+        probabilities[i] = 1.0
+
+    return (probabilities, aliases)
+
+
+def _sampleNumpy(weights, count, generator):
+    """Randomly pick indices in a single vectorized operation.
+
+    If NumPy is not available, this falls back to :func:`_sampleAlias`.
+
+    Parameters
+    ----------
+    weights : list of float
+        Positive weights.
+    count : int
+        Total number of indices to pick.
+    generator : random.Random
+        Pseudo-random number generator.
+
+    Returns
+    -------
+    numpy.ndarray or iterable of int
+        The indices picked.
+    """
+    numpy = _getNumpy()
+    if numpy is None:
+        return _sampleAlias(weights, count, generator)
+
+    cumulative = numpy.cumsum(weights, dtype=numpy.float64)
+    values = _createNumpyGenerator(generator).random_sample(count)
+    values *= cumulative[-1]
+    indices = numpy.searchsorted(cumulative, values, side='right')
+
+    # Clamp the indices to guard against floating-point rounding errors.
+    numpy.minimum(indices, len(weights) - 1, out=indices)
+    return indices
+
+
+def _createNumpyGenerator(generator):
+    """Create a NumPy generator.
+
+    The new generator is seeded from the one given so that the seed passed to
+    functions such as :func:`run` keeps on driving the whole evaluation.
+
+    Parameters
+    ----------
+    generator : random.Random
+        Pseudo-random number generator to seed from.
+
+    Returns
+    -------
+    numpy.random.RandomState
+        The NumPy generator.
+    """
+    seed = int(generator.random() * 0x100000000)
+    return _getNumpy().random.RandomState(seed)
+
+
+def _iterateSteps(count):
+    """Iterate a given number of times.
+
+    Parameters
+    ----------
+    count : int
+        Number of iterations, or ``None`` to iterate indefinitely.
+
+    Returns
+    -------
+    iterable
+        The iterable.
+    """
+    if count is None:
+        return itertools.repeat(None)
+
+    return _range(count)
+
+
+_SAMPLERS = {
+    Sampling.LINEAR: _sampleLinear,
+    Sampling.BISECT: _sampleBisect,
+    Sampling.ALIAS: _sampleAlias,
+    Sampling.NUMPY: _sampleNumpy,
+}
+
+
+class _FakeObject(object):
+    """Stand-in for the class ``MObject``.
+
+    Attributes
+    ----------
+    index : int
+        Index of the node within the scene, or -1 for the null object.
+    """
+
+    __slots__ = ('index',)
+
+    def __init__(self, index=-1):
+        """Constructor.
+
+        Parameters
+        ----------
+        index : int
+            Index of the node within the scene.
+        """
+        self.index = index
+
+    def isNull(self):
+        return self.index < 0
+
+    def __eq__(self, other):
+        return isinstance(other, _FakeObject) and self.index == other.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.index)
+
+
+_FakeObject.kNullObj = _FakeObject()
+
+
+class _FakeScene(object):
+    """In-memory scene storing the properties of the nodes in arrays.
+
+    Attributes
+    ----------
+    typeNames : list of str
+        Name of each node type found in the scene.
+    types : array of int
+        Index of the type name of each node.
+    parents : array of int
+        Index of the parent of each node, or -1 if it has none.
+    names : dict
+        Name of the nodes that were explicitely named, indexed by node.
+    connections : list of tuple
+        Source node, source attribute, destination node, and destination
+        attribute of each connection.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self.typeNames = []
+        self.types = array.array('l')
+        self.parents = array.array('l')
+        self.names = {}
+        self.connections = []
+        self._typeIndices = {}
+
+    def createNode(self, type):
+        typeIndex = self._typeIndices.get(type)
+        if typeIndex is None:
+            typeIndex = len(self.typeNames)
+            self.typeNames.append(type)
+            self._typeIndices[type] = typeIndex
+
+        self.types.append(typeIndex)
+        self.parents.append(-1)
+        return _FakeObject(len(self.types) - 1)
+
+    def setParent(self, node, parent):
+        self.parents[node] = parent
+
+    def rename(self, node, name):
+        self.names[node] = name
+
+    def connect(self, sourceNode, sourceAttr, destNode, destAttr):
+        self.connections.append((sourceNode, sourceAttr, destNode, destAttr))
+
+
+class _FakeDGModifier(object):
+    """Stand-in for the class ``MDGModifier``.
+
+    The nodes are created right away while the other operations are queued
+    until :meth:`doIt` is called. As with Maya, the modifier isn't tied to
+    a scene and operates on the current one.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self._operations = []
+
+    @property
+    def _scene(self):
+        return _FakeOpenMaya.scene
+
+    def createNode(self, type):
+        return self._scene.createNode(type)
+
+    def connect(self, sourceNode, sourceAttr, destNode, destAttr):
+        self._operations.append((self._scene.connect,
+                                 (sourceNode.index, sourceAttr,
+                                  destNode.index, destAttr)))
+
+    def renameNode(self, node, newName):
+        self._operations.append((self._scene.rename, (node.index, newName)))
+
+    def doIt(self):
+        for function, args in self._operations:
+            function(*args)
+
+        del self._operations[:]
+
+
+class _FakeDagModifier(_FakeDGModifier):
+    """Stand-in for the class ``MDagModifier``."""
+
+    def createNode(self, type, parent=_FakeObject.kNullObj):
+        oNode = self._scene.createNode(type)
+        if parent.index >= 0:
+            self._operations.append((self._scene.setParent,
+                                     (oNode.index, parent.index)))
+
+        return oNode
+
+    def reparentNode(self, node, newParent=_FakeObject.kNullObj):
+        self._operations.append((self._scene.setParent,
+                                 (node.index, newParent.index)))
+
+
+class _FakeFnDependencyNode(object):
+    """Stand-in for the class ``MFnDependencyNode``."""
+
+    def __init__(self, object):
+        """Constructor.
+
+        Parameters
+        ----------
+        object : revl._FakeObject
+            Node to operate on.
+        """
+        self._scene = _FakeOpenMaya.scene
+        self._object = object
+
+    def object(self):
+        return self._object
+
+    def typeName(self):
+        return self._scene.typeNames[self._scene.types[self._object.index]]
+
+    def name(self):
+        name = self._scene.names.get(self._object.index)
+        if name is None:
+            return '%s%i' % (self.typeName(), self._object.index)
+
+        return name
+
+    def setName(self, name):
+        self._scene.rename(self._object.index, name)
+        return name
+
+
+class _FakeFnDagNode(_FakeFnDependencyNode):
+    """Stand-in for the class ``MFnDagNode``."""
+
+    def parentCount(self):
+        return int(self._scene.parents[self._object.index] >= 0)
+
+    def parent(self, index):
+        return _FakeObject(self._scene.parents[self._object.index])
+
+
+class _FakeNodeClass(object):
+    """Stand-in for the class ``MNodeClass``.
+
+    The attributes are represented by their names.
+    """
+
+    def __init__(self, type):
+        """Constructor.
+
+        Parameters
+        ----------
+        type : str
+            Node type.
+        """
+        self._type = type
+
+    def typeName(self):
+        return self._type
+
+    def attribute(self, name):
+        return name
+
+
+class _FakeFileIO(object):
+    """Stand-in for the class ``MFileIO``."""
+
+    @staticmethod
+    def newFile(force=False):
+        _FakeOpenMaya.scene = _FakeScene()
+
+    @staticmethod
+    def open(fileName, type=None, force=False):
+        with open(fileName, 'rb') as f:
+            _FakeOpenMaya.scene = pickle.load(f)
+
+    @staticmethod
+    def exportAll(fileName, type=None, preserveReferences=False):
+        with open(fileName, 'wb') as f:
+            pickle.dump(_FakeOpenMaya.scene, f, pickle.HIGHEST_PROTOCOL)
+
+
+class _FakeOpenMaya(object):
+    """Stand-in for the subset of the Maya Python API used by revl.
+
+    Attributes
+    ----------
+    scene : revl._FakeScene
+        Current scene.
+    """
+
+    MObject = _FakeObject
+    MDGModifier = _FakeDGModifier
+    MDagModifier = _FakeDagModifier
+    MFnDependencyNode = _FakeFnDependencyNode
+    MFnDagNode = _FakeFnDagNode
+    MNodeClass = _FakeNodeClass
+    MFileIO = _FakeFileIO
+    scene = _FakeScene()
 
 
 def _formatType(cls):
@@ -0,0 +1,723 @@
+#!/usr/bin/env python
+
+import functools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+_HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(_HERE, os.pardir)))
+
+import revl
+
+
+OpenMaya = revl._getBinding(revl.Backend.FAKE).OpenMaya
+
+
+class _Builder(object):
+
+    def __init__(self, type):
+        self.type = type
+
+    def __call__(self, context):
+        return self.make(context)
+
+    def make(self, context):
+        return revl.createDgNode(context, self.type)
+
+    @classmethod
+    def makeTransform(cls, context):
+        return revl.createTransform(context)
+
+
+class _LambertBuilder(_Builder):
+
+    def __init__(self):
+        super(_LambertBuilder, self).__init__('lambert')
+
+
+class FakeTest(unittest.TestCase):
+
+    def setUp(self):
+        OpenMaya.MFileIO.newFile(True)
+
+    def testImport(self):
+        code = (
+            "import sys\n"
+            "import revl\n"
+            "from revl import *\n"
+            "sys.exit(hasattr(revl, 'NULL_OBJ') != ('NULL_OBJ' in revl.__all__))\n"
+        )
+        self.assertEqual(subprocess.call([sys.executable, '-c', code], cwd=os.path.join(_HERE, os.pardir)), 0)
+
+    def testContext(self):
+        context = revl.Context(backend=revl.Backend.FAKE)
+        self.assertEqual(context.backend, revl.Backend.FAKE)
+        self.assertIsInstance(context.dg, OpenMaya.MDGModifier)
+        self.assertIsInstance(context.dag, OpenMaya.MDagModifier)
+        self.assertTrue(revl.pickTransform(context).isNull())
+
+    def testCreateNodes(self):
+        context = revl.Context(backend=revl.Backend.FAKE)
+
+        self.assertTrue(revl.createDagNode(context, 'mesh', parent=True).isNull())
+
+        oTransform = revl.createTransform(context, name='xform')
+        oChild = revl.createTransform(context, parent=True)
+        oMesh = revl.createDagNode(context, 'mesh', parent=True)
+        oLight = revl.createDagNode(context, 'pointLight')
+        oLambert = revl.createDgNode(context, 'lambert')
+        primitive = revl.createPrimitive(context, revl.PrimitiveType.NURBS_CUBE, name='kubo', parent=True)
+        self.assertEqual(len(context.transforms), 4)
+        self.assertEqual(context.nodeCount, 1 + 1 + 1 + 2 + 1 + 8)
+        self.assertEqual(len(context.nodes), 0)
+        self.assertEqual(len(context.hierarchy), 0)
+        self.assertRaises(ValueError, revl.pickNode, context, 'mesh')
+        self.assertRaises(ValueError, revl.reparent, context)
+        self.assertRaises(ValueError, revl.createTransform, context, parent=True, policy=revl.HierarchyPolicy())
+
+        scene = OpenMaya.scene
+        self.assertEqual(scene.parents[oChild.index], -1)
+        self.assertEqual(scene.connections, [])
+        self.assertEqual(scene.names, {})
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        self.assertEqual(OpenMaya.MFnDagNode(oTransform).name(), 'xform')
+        self.assertEqual(OpenMaya.MFnDagNode(oChild).parent(0), oTransform)
+        self.assertIn(OpenMaya.MFnDagNode(oMesh).parent(0), (oTransform, oChild))
+        self.assertEqual(OpenMaya.MFnDagNode(oMesh).typeName(), 'mesh')
+        self.assertEqual(OpenMaya.MFnDagNode(oLight).parentCount(), 1)
+        self.assertEqual(OpenMaya.MFnDependencyNode(oLambert).typeName(), 'lambert')
+
+        self.assertEqual(OpenMaya.MFnDagNode(primitive.transform).name(), 'kubo')
+        self.assertEqual(OpenMaya.MFnDagNode(primitive.transform).parentCount(), 1)
+        self.assertEqual(OpenMaya.MFnDependencyNode(primitive.generator).typeName(), 'makeNurbCube')
+        self.assertEqual(len(primitive.shapes), 6)
+        self.assertEqual(len(scene.connections), 6)
+        for oShape, connection in zip(primitive.shapes, scene.connections):
+            self.assertEqual(OpenMaya.MFnDagNode(oShape).parent(0), primitive.transform)
+            self.assertEqual(connection[0], primitive.generator.index)
+            self.assertEqual(connection[2], oShape.index)
+            self.assertEqual(connection[3], 'create')
+
+    def testNodeRegistry(self):
+        registry = revl.NodeRegistry()
+        generator = revl.Context(backend=revl.Backend.FAKE).random
+        self.assertIsNone(registry.pick('mesh', generator))
+
+        oNodes = [OpenMaya.MDGModifier().createNode('mesh') for _ in range(5)]
+        oLambert = OpenMaya.MDGModifier().createNode('lambert')
+        for oNode in oNodes:
+            registry.add('mesh', oNode)
+
+        registry.add('lambert', oLambert)
+        self.assertEqual(len(registry), 6)
+        self.assertEqual(registry.count('mesh'), 5)
+        self.assertEqual(registry.count('lambert'), 1)
+        self.assertEqual(registry.count('clamp'), 0)
+        self.assertIs(registry.pick('lambert', generator), oLambert)
+        self.assertIn(registry.pick('mesh', generator), oNodes)
+
+        registry.remove(oNodes[1])
+        registry.remove(oNodes[4])
+        registry.remove(oLambert)
+        self.assertRaises(KeyError, registry.remove, oLambert)
+        self.assertEqual(len(registry), 3)
+        self.assertNotIn(oNodes[1], registry)
+        self.assertIn(oNodes[3], registry)
+        self.assertIsNone(registry.pick('lambert', generator))
+        picked = set(registry.pick('mesh', generator).index for _ in range(100))
+        self.assertEqual(picked, set(oNodes[i].index for i in (0, 2, 3)))
+
+        for i in (0, 2, 3):
+            registry.remove(oNodes[i])
+
+        self.assertEqual(len(registry), 0)
+        self.assertIsNone(registry.pick('mesh', generator))
+        self.assertEqual(repr(registry), 'NodeRegistry({})')
+
+    def testPickNode(self):
+        context = revl.Context(backend=revl.Backend.FAKE, trackNodes=True)
+        self.assertTrue(revl.pickNode(context, 'mesh').isNull())
+
+        commands = [
+            (1.0, revl.createTransform),
+            (1.0, revl.createDgNode, ('lambert',)),
+            (1.0, revl.createPrimitive, (), {'type': revl.PrimitiveType.POLY_CUBE}),
+        ]
+        revl.run(commands, 123, seed=1.23, context=context)
+        self.assertEqual(len(context.nodes), context.nodeCount)
+        self.assertEqual(context.nodes.count('transform'), len(context.transforms))
+        self.assertEqual(context.nodes.count('mesh'), context.nodes.count('polyCube'))
+
+        scene = OpenMaya.scene
+        for type in ('transform', 'lambert', 'mesh', 'polyCube'):
+            oNode = revl.pickNode(context, type)
+            self.assertEqual(scene.typeNames[scene.types[oNode.index]], type)
+
+    def testHierarchy(self):
+        hierarchy = revl.Hierarchy()
+        generator = revl.Context(backend=revl.Backend.FAKE).random
+        self.assertEqual(hierarchy.pick(generator), -1)
+
+        oNodes = [OpenMaya.MDGModifier().createNode('transform') for _ in range(5)]
+        self.assertEqual(hierarchy.add(oNodes[0]), 0)
+        self.assertEqual(hierarchy.pickNonDescendant(0, generator), -1)
+        self.assertEqual(hierarchy.add(oNodes[1], 0), 1)
+        self.assertEqual(hierarchy.add(oNodes[2], 1), 2)
+        self.assertEqual(hierarchy.add(oNodes[3], 0), 3)
+        self.assertEqual(hierarchy.add(oNodes[4]), 4)
+        self.assertEqual(len(hierarchy), 5)
+        self.assertEqual(hierarchy.find(oNodes[3]), 3)
+        self.assertEqual(hierarchy.find(OpenMaya.MObject.kNullObj), -1)
+        self.assertEqual(list(hierarchy.parents), [-1, 0, 1, 0, -1])
+        self.assertEqual(list(hierarchy.depths), [1, 2, 3, 2, 1])
+        self.assertEqual(list(hierarchy.childCounts), [2, 1, 0, 0, 0])
+        self.assertTrue(hierarchy.isAncestor(0, 2))
+        self.assertTrue(hierarchy.isAncestor(1, 2))
+        self.assertFalse(hierarchy.isAncestor(3, 2))
+        self.assertFalse(hierarchy.isAncestor(2, 2))
+        self.assertFalse(hierarchy.isAncestor(2, 0))
+
+        for _ in range(100):
+            self.assertIn(hierarchy.pickNonDescendant(1, generator), (-1, 0, 3, 4))
+
+        hierarchy.setParent(0, 4)
+        self.assertEqual(list(hierarchy.parents), [4, 0, 1, 0, -1])
+        self.assertEqual(list(hierarchy.depths), [2, 3, 4, 3, 1])
+        self.assertEqual(list(hierarchy.childCounts), [2, 1, 0, 0, 1])
+
+        hierarchy.setParent(1, 3)
+        hierarchy.setParent(3, -1)
+        self.assertEqual(list(hierarchy.parents), [4, 3, 1, -1, -1])
+        self.assertEqual(list(hierarchy.depths), [2, 2, 3, 1, 1])
+        self.assertEqual(list(hierarchy.childCounts), [0, 1, 0, 1, 1])
+
+    def testReparent(self):
+        commands = [
+            (1.0, revl.createTransform, (), {'parent': True}),
+            (1.0, revl.createPrimitive, (), {'parent': True}),
+            (1.0, revl.unparent),
+            (3.0, revl.reparent),
+        ]
+
+        context = revl.Context(backend=revl.Backend.FAKE, trackNodes=True)
+        revl.run(commands, 1000, seed=1.23, context=context, flushEvery=100)
+        hierarchy = context.hierarchy
+        self.assertEqual(len(hierarchy), len(context.transforms))
+
+        scene = OpenMaya.scene
+        for index, oNode in enumerate(hierarchy.nodes):
+            parent = hierarchy.parents[index]
+            expected = -1 if parent < 0 else hierarchy.nodes[parent].index
+            self.assertEqual(scene.parents[oNode.index], expected)
+
+            depth = 1
+            current = oNode.index
+            while scene.parents[current] >= 0:
+                current = scene.parents[current]
+                depth += 1
+                self.assertTrue(depth <= len(hierarchy))
+
+            self.assertEqual(hierarchy.depths[index], depth)
+
+        self.assertEqual(sum(hierarchy.childCounts), sum(1 for parent in hierarchy.parents if parent >= 0))
+
+    def testHierarchyPolicy(self):
+        def createHierarchy(policy, count=200):
+            commands = [
+                (1.0, revl.createTransform, (), {'parent': True, 'policy': policy}),
+            ]
+            return revl.run(commands, count, seed=1.23, context=revl.Context(backend=revl.Backend.FAKE, trackNodes=True)).hierarchy
+
+        hierarchy = createHierarchy(revl.HierarchyPolicy(maxDepth=3))
+        self.assertEqual(max(hierarchy.depths), 3)
+
+        hierarchy = createHierarchy(revl.HierarchyPolicy(maxChildren=2))
+        self.assertEqual(max(hierarchy.childCounts), 2)
+        self.assertEqual(hierarchy.parents.count(-1), 1)
+
+        hierarchy = createHierarchy(revl.HierarchyPolicy(maxChildren=1))
+        self.assertEqual(max(hierarchy.depths), 200)
+
+        hierarchy = createHierarchy(revl.HierarchyPolicy(maxDepth=2, maxChildren=3))
+        self.assertEqual(max(hierarchy.depths), 2)
+        self.assertEqual(max(hierarchy.childCounts), 3)
+        self.assertEqual(hierarchy.parents.count(-1), 50)
+
+        hierarchy = createHierarchy(revl.HierarchyPolicy(depthWeights=[1.0]))
+        self.assertEqual(max(hierarchy.depths), 2)
+        self.assertEqual(hierarchy.parents.count(-1), 1)
+
+        hierarchy = createHierarchy(revl.HierarchyPolicy(depthWeights=[0.0, 1.0, 1.0]))
+        self.assertEqual(max(hierarchy.depths), 1)
+
+        hierarchy = createHierarchy(revl.HierarchyPolicy(depthWeights=[1.0, 0.0, 1.0]))
+        self.assertEqual(max(hierarchy.depths), 2)
+
+    def testHierarchyPolicyIndex(self):
+        policy = revl.HierarchyPolicy(maxDepth=4, maxChildren=3)
+        weightedPolicy = revl.HierarchyPolicy(maxDepth=4, maxChildren=3, depthWeights=[1.0, 0.0, 2.0])
+        commands = [
+            (3.0, revl.createTransform, (), {'parent': True, 'policy': policy}),
+            (1.0, revl.createPrimitive, (), {'parent': True, 'policy': policy}),
+            (1.0, revl.createTransform, (), {'parent': True, 'policy': weightedPolicy}),
+            (1.0, revl.unparent),
+            (2.0, revl.reparent),
+        ]
+
+        context = revl.run(commands, 1000, seed=1.23, context=revl.Context(backend=revl.Backend.FAKE, trackNodes=True))
+        hierarchy = context.hierarchy
+        buckets = hierarchy._parentIndices[(4, 3)].buckets
+        indexed = set()
+        for depth, bucket in enumerate(buckets, 1):
+            for index in bucket:
+                self.assertEqual(hierarchy.depths[index], depth)
+
+            indexed.update(bucket)
+
+        expected = set(index for index in range(len(hierarchy))
+                       if hierarchy.depths[index] < 4 and hierarchy.childCounts[index] < 3)
+        self.assertEqual(indexed, expected)
+        self.assertEqual(sum(len(bucket) for bucket in buckets), len(expected))
+
+        parentIndex = hierarchy._parentIndices[(4, 3)]
+        self.assertEqual(sorted(parentIndex.nodes), sorted(expected))
+
+        tree = parentIndex._trees[(1.0, 0.0, 2.0)]
+        weights = [weight if depth < len(buckets) and buckets[depth] else 0.0
+                   for depth, weight in enumerate([1.0, 0.0, 2.0])]
+        self.assertEqual(tree._weights, weights)
+        self.assertAlmostEqual(tree.total(), sum(weights))
+        self.assertEqual(tree.count, sum(1 for weight in weights if weight > 0.0))
+
+    def testWeightTree(self):
+        tree = revl._WeightTree([1.0, 0.0, 2.0, 3.0, 0.0])
+        self.assertEqual(tree.count, 3)
+        self.assertEqual(tree.total(), 6.0)
+        self.assertEqual([tree.find(threshold) for threshold in (0.0, 0.5, 1.0, 2.9, 3.0, 5.9)], [0, 0, 2, 2, 3, 3])
+
+        tree.update(0, 0.0)
+        tree.update(4, 4.0)
+        self.assertEqual(tree.count, 3)
+        self.assertEqual(tree.total(), 9.0)
+        self.assertEqual([tree.find(threshold) for threshold in (0.0, 1.9, 2.0, 5.0, 8.9)], [2, 2, 3, 4, 4])
+
+        # Out of range thresholds settle on the last positive weight.
+        self.assertEqual(tree.find(9.0), 4)
+
+    def testCreateBatches(self):
+        context = revl.Context(backend=revl.Backend.FAKE, trackNodes=True)
+
+        oLamberts = revl.createDgNodes(context, 'lambert', 3)
+        oRoots = revl.createTransforms(context, 2, name='root')
+        oChildren = revl.createTransforms(context, 5, parent=True, policy=revl.HierarchyPolicy(maxChildren=2))
+        self.assertTrue(max(context.hierarchy.childCounts) <= 2)
+        primitives = revl.createPrimitives(context, 4, type=revl.PrimitiveType.POLY_CUBE, parent=True)
+        self.assertEqual(len(oLamberts), 3)
+        self.assertEqual(len(oRoots), 2)
+        self.assertEqual(len(oChildren), 5)
+        self.assertEqual(len(primitives), 4)
+        self.assertEqual(context.nodeCount, 3 + 2 + 5 + 4 * 3)
+        self.assertEqual(len(context.nodes), context.nodeCount)
+        self.assertEqual(context.nodes.count('lambert'), 3)
+        self.assertEqual(context.nodes.count('transform'), 2 + 5 + 4)
+        self.assertEqual(context.transforms, oRoots + oChildren + [primitive.transform for primitive in primitives])
+        self.assertEqual(list(context.hierarchy.parents[:2]), [-1, -1])
+        self.assertTrue(all(parent >= 0 for parent in context.hierarchy.parents[2:]))
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        for oRoot in oRoots:
+            self.assertEqual(OpenMaya.MFnDagNode(oRoot).name(), 'root')
+
+        for oChild in oChildren:
+            self.assertEqual(OpenMaya.MFnDagNode(oChild).parentCount(), 1)
+
+        commands = [
+            (1.0, revl.createTransforms, (10,)),
+            (1.0, revl.createDgNodes, ('lambert', 10)),
+        ]
+        context = revl.run(commands, 10, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertEqual(context.nodeCount, 100)
+
+        # Creating the primitives in a batch gives the same scene as creating
+        # them one by one.
+        scenes = []
+        for create in (
+                lambda context: revl.createPrimitives(context, 20, parent=True, forceTransformCreation=False),
+                lambda context: [revl.createPrimitive(context, parent=True, forceTransformCreation=False) for _ in range(20)]):
+            OpenMaya.MFileIO.newFile(True)
+            context = revl.Context(backend=revl.Backend.FAKE, trackNodes=True)
+            context.random.seed(1.23)
+            revl.createTransforms(context, 3)
+            create(context)
+            self.assertEqual(len(context.nodes), context.nodeCount)
+            self.assertEqual(len(context.hierarchy), len(context.transforms))
+            context.dag.doIt()
+            context.dg.doIt()
+            scene = OpenMaya.scene
+            scenes.append((list(scene.types), list(scene.parents), scene.connections, context.nodeCount))
+
+        self.assertEqual(scenes[0], scenes[1])
+
+    def testShareGenerator(self):
+        context = revl.Context(backend=revl.Backend.FAKE, trackNodes=True)
+
+        primitives = revl.createPrimitives(context, 3, type=revl.PrimitiveType.POLY_CUBE, shareGenerator=True)
+        primitives += revl.createPrimitives(context, 2, type=revl.PrimitiveType.NURBS_CIRCLE, shareGenerator=True)
+        primitive = revl.createPrimitive(context, type=revl.PrimitiveType.POLY_CUBE)
+        self.assertEqual(set(context.generators), set([revl.PrimitiveType.POLY_CUBE, revl.PrimitiveType.NURBS_CIRCLE]))
+        self.assertTrue(all(p.generator is context.generators[revl.PrimitiveType.POLY_CUBE] for p in primitives[:3]))
+        self.assertTrue(all(p.generator is context.generators[revl.PrimitiveType.NURBS_CIRCLE] for p in primitives[3:]))
+        self.assertIsNot(primitive.generator, primitives[0].generator)
+        self.assertEqual(context.nodes.count('polyCube'), 2)
+        self.assertEqual(context.nodes.count('makeNurbCircle'), 1)
+        self.assertEqual(context.nodeCount, 1 + 3 * 2 + 1 + 2 * 2 + 3)
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        scene = OpenMaya.scene
+        self.assertEqual(len(scene.types), context.nodeCount)
+        sources = [connection[0] for connection in scene.connections]
+        self.assertEqual(sources.count(primitives[0].generator.index), 3)
+        self.assertEqual(sources.count(primitives[3].generator.index), 2)
+
+    def testUnparent(self):
+        context = revl.Context(backend=revl.Backend.FAKE)
+
+        oRoot = revl.createTransform(context)
+        oTransform = revl.createTransform(context, parent=True)
+        context.dag.doIt()
+        self.assertEqual(OpenMaya.MFnDagNode(oTransform).parent(0), oRoot)
+
+        context.transforms.remove(oRoot)
+        revl.unparent(context)
+        context.dag.doIt()
+        self.assertEqual(OpenMaya.MFnDagNode(oTransform).parentCount(), 0)
+
+    def testRun(self):
+        commands = [
+            (1.0, revl.createTransform, (), {'parent': True}),
+            (1.0, revl.createPrimitive, (), {'parent': True}),
+            (1.0, revl.unparent),
+        ]
+
+        scenes = []
+        for _ in range(2):
+            OpenMaya.MFileIO.newFile(True)
+            context = revl.Context(backend=revl.Backend.FAKE)
+            revl.run(commands, 123, seed=1.23, context=context, flushEvery=10)
+            scene = OpenMaya.scene
+            scenes.append((list(scene.types), list(scene.parents), scene.connections))
+
+        self.assertEqual(scenes[0], scenes[1])
+        self.assertTrue(len(scenes[0][0]) > 123)
+
+        commands.append((0.0, revl.createTransform))
+        for sampling in (revl.Sampling.LINEAR, revl.Sampling.BISECT,
+                         revl.Sampling.ALIAS, revl.Sampling.NUMPY):
+            scenes = []
+            for flushEvery in (None, 100, 10 ** 6):
+                OpenMaya.MFileIO.newFile(True)
+                context = revl.Context(backend=revl.Backend.FAKE)
+                revl.run(commands, 3000, seed=1.23, context=context,
+                         sampling=sampling,
+                         flushEvery=flushEvery)
+                scene = OpenMaya.scene
+                scenes.append((list(scene.types), list(scene.parents), scene.connections))
+
+            self.assertEqual(scenes[0], scenes[1])
+            self.assertEqual(scenes[0], scenes[2])
+
+    def testRunSummary(self):
+        commands = [
+            (1.0, revl.createTransform),
+            (0.0, revl.createPrimitive),
+        ]
+
+        context = revl.run(commands, 123, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertEqual(context.summary.count, 123)
+        self.assertTrue(context.summary.elapsed > 0.0)
+        self.assertEqual(context.summary.rate, 123 / context.summary.elapsed)
+        self.assertEqual(context.nodeCount, 123)
+
+        context = revl.run([(0.0, revl.createTransform)], 123, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertEqual(context.summary.count, 0)
+
+        self.assertRaises(ValueError, revl.run, commands)
+        self.assertRaises(ValueError, revl.run, commands, 123, flushEvery=0)
+
+        context = revl.run(commands, 3000, flushEvery=1000, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertEqual(context.summary.count, 3000)
+        self.assertEqual(context.nodeCount, 3000)
+
+    def testRunUntilNodes(self):
+        commands = [
+            (1.0, revl.createTransform),
+            (1.0, revl.createPrimitive, (), {'type': revl.PrimitiveType.POLY_CUBE}),
+        ]
+
+        # No command creates more than twice the average number of nodes,
+        # hence only the last one can exceed the target.
+        for seed in range(10):
+            OpenMaya.MFileIO.newFile(True)
+            context = revl.run(commands, untilNodes=5000, seed=seed, context=revl.Context(backend=revl.Backend.FAKE), flushEvery=100)
+            self.assertTrue(5000 <= context.nodeCount < 5000 + 3)
+            self.assertEqual(len(OpenMaya.scene.types), context.nodeCount)
+            self.assertTrue(context.summary.count > 5000 // 3)
+
+        context = revl.run([(1.0, revl.unparent)], untilNodes=5, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertEqual(context.nodeCount, 0)
+        self.assertTrue(revl._BATCH_SIZE <= context.summary.count < 2 * revl._BATCH_SIZE)
+
+        context = revl.run(commands, 10, untilNodes=5000, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertEqual(context.summary.count, 10)
+
+    def testRunDuration(self):
+        commands = [
+            (1.0, revl.createTransform),
+        ]
+
+        context = revl.run(commands, duration=0.05, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertTrue(context.summary.count > 0)
+        self.assertTrue(context.summary.elapsed >= 0.05)
+
+        context = revl.run([(1.0, lambda context: time.sleep(0.002))], duration=0.1, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertTrue(0.1 <= context.summary.elapsed < 0.15)
+
+        context = revl.run(commands, 10, duration=60.0, context=revl.Context(backend=revl.Backend.FAKE))
+        self.assertEqual(context.summary.count, 10)
+
+    def testRunInstrumented(self):
+        commands = [
+            (2.0, revl.createTransform, (), {'parent': True}),
+            (0.0, revl.createTransform),
+            (1.0, revl.createPrimitive, (), {'parent': True}),
+        ]
+
+        context = revl.Context(backend=revl.Backend.FAKE)
+        revl.run(commands, 123, seed=1.23, context=context, flushEvery=10, instrument=True)
+        stats = context.stats
+        self.assertIsInstance(stats, revl.Stats)
+        self.assertEqual([entry.command for entry in stats.commands], [revl.Command(*command) for command in commands])
+        self.assertEqual(sum(entry.count for entry in stats.commands), 123)
+        self.assertEqual(stats.commands[1].count, 0)
+        self.assertTrue(stats.dagDoIt > 0.0)
+        self.assertTrue(stats.dgDoIt > 0.0)
+        for entry in (stats.commands[0], stats.commands[2]):
+            self.assertTrue(entry.count > 0)
+            self.assertEqual(sum(entry.histogram), entry.count)
+            self.assertTrue(0.0 < entry.min <= entry.mean <= entry.max)
+            self.assertTrue(entry.total >= entry.max)
+
+        revl.run(commands, 123, seed=1.23, context=context)
+        self.assertIsNone(context.stats)
+
+    def testRunHooked(self):
+        class Recorder(revl.Hook):
+
+            def __init__(self, name, events):
+                self.name = name
+                self.events = events
+
+            def beforeCommand(self, context, index, command, step):
+                self.events.append((self.name, 'before', index, command.function, step))
+
+            def afterCommand(self, context, index, command, step):
+                self.events.append((self.name, 'after', index, command.function, step))
+
+            def beforeDoIt(self, context, modifier):
+                self.events.append((self.name, 'beforeDoIt', modifier))
+
+            def afterDoIt(self, context, modifier):
+                self.events.append((self.name, 'afterDoIt', modifier))
+
+        commands = [
+            (0.0, revl.createPrimitive),
+            (1.0, revl.createTransform),
+        ]
+
+        events = []
+        hooks = [Recorder('a', events), Recorder('b', events)]
+        context = revl.Context(backend=revl.Backend.FAKE)
+        revl.run(commands, 3, seed=1.23, context=context, flushEvery=2, instrument=True, hooks=hooks)
+        self.assertEqual(context.hooks, hooks)
+        self.assertEqual(context.stats.commands[1].count, 3)
+
+        steps = [event for event in events if len(event) == 5]
+        expected = []
+        for step in range(3):
+            expected += [
+                ('a', 'before', 1, revl.createTransform, step),
+                ('b', 'before', 1, revl.createTransform, step),
+                ('b', 'after', 1, revl.createTransform, step),
+                ('a', 'after', 1, revl.createTransform, step),
+            ]
+
+        self.assertEqual(steps, expected)
+
+        doIts = [event[:2] for event in events if len(event) == 3]
+        self.assertEqual(doIts, [('a', 'beforeDoIt'), ('b', 'beforeDoIt'), ('b', 'afterDoIt'), ('a', 'afterDoIt')] * 4)
+        self.assertEqual([event[1] for event in events[7:9]], ['after', 'beforeDoIt'])
+        self.assertIsInstance(events[8][2], OpenMaya.MDagModifier)
+        self.assertNotIsInstance(events[12][2], OpenMaya.MDagModifier)
+
+        del events[:]
+        revl.run(commands, 3, seed=1.23, context=context)
+        self.assertEqual(len(events), 3 * 4 + 2 * 4)
+
+        del events[:]
+        revl.run(commands, 3, seed=1.23, context=context, hooks=[])
+        self.assertEqual(events, [])
+
+    def testSceneCache(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        cache = revl.SceneCache(os.path.join(path, 'cache'))
+        commands = [
+            (1.0, revl.createTransform, (), {'parent': True}),
+            (1.0, revl.createPrimitive, (), {'type': revl.PrimitiveType.POLY_CUBE}),
+        ]
+
+        def createScene(commands, count, seed=1.23, context=None, **kwargs):
+            OpenMaya.MFileIO.newFile(True)
+            if context is None:
+                context = revl.Context(backend=revl.Backend.FAKE)
+
+            context = cache.run(commands, count, seed=seed, context=context, **kwargs)
+            scene = OpenMaya.scene
+            return context, (list(scene.types), list(scene.parents), scene.connections)
+
+        context, expected = createScene(commands, 123)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(context.summary.count, 123)
+
+        context, scene = createScene(commands, 123)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNone(context.summary)
+        self.assertEqual(scene, expected)
+
+        createScene(commands, 123, seed=4.56)
+        createScene(commands, 124)
+        createScene(commands, 123, sampling=revl.Sampling.BISECT)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        self.assertEqual(len(os.listdir(cache.path)), 4)
+
+        createScene(commands, 123, seed=None)
+        createScene(commands, 123, duration=0.001)
+        createScene([(1.0, revl.createTransform, (), {'policy': revl.HierarchyPolicy(depthWeights=[1.0])})], 123)
+        createScene([(1.0, lambda context: None)], 123)
+        createScene([(1.0, _Builder('lambert').make)], 123)
+        createScene([(1.0, _Builder('lambert'))], 123)
+        createScene([(1.0, functools.partial(revl.createDgNode, type='lambert'))], 123)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+        self.assertIsNone(revl._fingerprint(_Builder('lambert').make))
+        self.assertIsNotNone(revl._fingerprint(_Builder.make))
+        self.assertIsNotNone(revl._fingerprint(_Builder))
+        self.assertIsNotNone(revl._fingerprint(revl.createDgNode))
+        self.assertIsNotNone(revl._fingerprint(len))
+
+        def makeCommand(type):
+            def command(context):
+                return revl.createDgNode(context, type)
+
+            return command
+
+        self.assertIsNone(revl._fingerprint(makeCommand('lambert')))
+        self.assertIsNotNone(revl._fingerprint(_Builder.makeTransform))
+        self.assertNotEqual(revl._fingerprint(_Builder.makeTransform), revl._fingerprint(_LambertBuilder.makeTransform))
+
+        createScene([(1.0, revl.createTransform, (), {'policy': revl.HierarchyPolicy(maxDepth=2)})], 123)
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+
+        context = revl.Context(backend=revl.Backend.FAKE)
+        revl.createTransform(context)
+        context.dag.doIt()
+        cache.run(commands, 123, seed=1.23, context=context)
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+
+        OpenMaya.MFileIO.newFile(True)
+        OpenMaya.MDGModifier().createNode('lambert')
+        context = cache.run(commands, 123, seed=1.23, context=revl.Context(backend=revl.Backend.FAKE), flushEvery=10)
+        self.assertEqual((cache.hits, cache.misses), (1, 6))
+        self.assertEqual(len(OpenMaya.scene.types), context.nodeCount)
+
+        _, scene = createScene(commands, 123, flushEvery=10)
+        self.assertEqual((cache.hits, cache.misses), (2, 6))
+        self.assertEqual(len(scene[0]), context.nodeCount)
+
+        createScene(commands, 123, context=revl.Context(backend=revl.Backend.FAKE, trackNodes=True))
+        self.assertEqual((cache.hits, cache.misses), (2, 7))
+        for _ in range(7):
+            createScene(commands, 123)
+
+        self.assertEqual((cache.hits, cache.misses), (9, 7))
+
+        size = sum(os.path.getsize(os.path.join(cache.path, fileName)) for fileName in os.listdir(cache.path))
+        cache.maxSize = size
+        createScene(commands, 123)
+        createScene(commands, 125)
+        self.assertEqual((cache.hits, cache.misses), (10, 8))
+        self.assertTrue(len(os.listdir(cache.path)) < 8)
+        createScene(commands, 123)
+        createScene(commands, 125)
+        self.assertEqual((cache.hits, cache.misses), (12, 8))
+
+        cache.clear()
+        self.assertEqual(os.listdir(cache.path), [])
+
+    def testExecuteInstrumented(self):
+        commands = [
+            (1.0, revl.createTransform, (), {'parent': True}),
+            (0.0, revl.createTransform),
+        ]
+        schedule = revl.plan(commands, 123, seed=1.23)
+
+        context = revl.execute(schedule, commands, context=revl.Context(backend=revl.Backend.FAKE), instrument=True)
+        self.assertEqual([entry.count for entry in context.stats.commands], [123, 0])
+        self.assertIsNone(context.stats.commands[1].min)
+        self.assertIsNone(context.stats.commands[1].mean)
+
+    def testExecute(self):
+        commands = [
+            (1.0, revl.createTransform, (), {'parent': True}),
+            (1.0, revl.createPrimitive, (), {'parent': True}),
+        ]
+        schedule = revl.plan(commands, 123, seed=1.23)
+
+        scenes = []
+        for _ in range(2):
+            OpenMaya.MFileIO.newFile(True)
+            revl.execute(schedule, commands, context=revl.Context(backend=revl.Backend.FAKE))
+            scene = OpenMaya.scene
+            scenes.append((list(scene.types), list(scene.parents), scene.connections))
+
+        self.assertEqual(scenes[0], scenes[1])
+
+        # The commands drawing more numbers than planned don't replay the
+        # same ones over and over.
+        schedule = revl.plan(commands, 2, seed=1.23, draws=1)
+        draws = []
+        for _ in range(2):
+            generator = revl._ReplayGenerator(schedule.values)
+            draws.append([generator.random() for _ in range(6)])
+
+        self.assertEqual(draws[0], draws[1])
+        self.assertEqual(draws[0][:2], list(schedule.values))
+        self.assertNotEqual(draws[0][2:4], draws[0][:2])
+        self.assertNotEqual(draws[0][4:6], draws[0][2:4])
+
+if __name__ == '__main__':
+    from tests.run import run
+    run('__main__')
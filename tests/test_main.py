@@ -1,6 +1,8 @@
 #!/usr/bin/env mayapy
 
 import os
+import random
+import subprocess
 import sys
 import unittest
 
@@ -37,15 +39,69 @@ class MainTest(unittest.TestCase):
         globalA = 0
         globalB = 0
 
+    def testImport(self):
+        code = (
+            "import sys\n"
+            "import revl\n"
+            "revl.validate([(1.0, revl.createTransform)])\n"
+            "revl.plan([(1.0, revl.createTransform)], 123, seed=1.23)\n"
+            "sys.exit('maya' in sys.modules)\n"
+        )
+        self.assertEqual(subprocess.call([sys.executable, '-c', code], cwd=os.path.join(_HERE, os.pardir)), 0)
+
     def testContext(self):
         context = revl.Context(extra='extra', user='user', data='data')
         self.assertIsInstance(context.dg, OpenMaya.MDGModifier)
         self.assertIsInstance(context.dag, OpenMaya.MDagModifier)
         self.assertEqual(context.transforms, [])
+        self.assertIsInstance(context.random, random.Random)
+        self.assertEqual(context.backend, revl.Backend.API1)
         self.assertEqual(context.extra, 'extra')
         self.assertEqual(context.user, 'user')
         self.assertEqual(context.data, 'data')
-        self.assertEqual(repr(context), "Context(dag=%r, data='data', dg=%r, extra='extra', transforms=[], user='user')" % (context.dag, context.dg))
+        self.assertEqual(repr(context), "Context(backend=0, dag=%r, data='data', dg=%r, extra='extra', generators={}, hierarchy=Hierarchy(nodes=[]), hooks=[], nodeCount=0, nodes=NodeRegistry({}), random=%r, stats=None, summary=None, trackNodes=False, transforms=[], user='user')" % (context.dag, context.dg, context.random))
+
+    def testBackend1(self):
+        from maya.api import OpenMaya as OpenMaya2
+
+        context = revl.Context(backend=revl.Backend.API2)
+        self.assertEqual(context.backend, revl.Backend.API2)
+        self.assertIsInstance(context.dg, OpenMaya2.MDGModifier)
+        self.assertIsInstance(context.dag, OpenMaya2.MDagModifier)
+        self.assertTrue(revl.pickTransform(context).isNull())
+        self.assertTrue(revl.createDagNode(context, 'mesh', parent=True).isNull())
+
+        oTransform = revl.createTransform(context, name='xform')
+        primitive = revl.createPrimitive(context, revl.PrimitiveType.POLY_CUBE, name='cube', parent=True)
+        oNode = revl.createDagNode(context, 'pointLight')
+        self.assertTrue(revl.createDgNode(context, 'lambert').hasFn(OpenMaya2.MFn.kLambert))
+        revl.unparent(context)
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        self.assertEqual(OpenMaya2.MFnDagNode(oTransform).name(), 'xform')
+        self.assertEqual(OpenMaya2.MFnDagNode(primitive.transform).name(), 'cube')
+        self.assertTrue(oNode.hasFn(OpenMaya2.MFn.kPointLight))
+        inMesh = OpenMaya2.MFnDependencyNode(primitive.shapes[0]).findPlug('inMesh', False)
+        self.assertTrue(inMesh.source().node().hasFn(OpenMaya2.MFn.kPolyCube))
+
+    def testBackend2(self):
+        self.assertEqual(revl.getDefaultBackend(), revl.Backend.API1)
+        revl.setDefaultBackend(revl.Backend.API2)
+        try:
+            self.assertEqual(revl.getDefaultBackend(), revl.Backend.API2)
+            self.assertEqual(revl.Context().backend, revl.Backend.API2)
+
+            commands = [
+                (1.0, revl.createTransform, (), {'parent': True}),
+                (1.0, revl.createPrimitive, (), {'parent': True}),
+            ]
+            context = revl.run(commands, 123, seed=1.23)
+            self.assertEqual(context.backend, revl.Backend.API2)
+            self.assertEqual(len(context.transforms), 123)
+        finally:
+            revl.setDefaultBackend(revl.Backend.API1)
 
     def testRun1(self):
         commands = [
@@ -131,6 +187,175 @@ class MainTest(unittest.TestCase):
         context = revl.run(commands, 123)
         self.assertIsInstance(context, revl.Context)
 
+    def testRun8(self):
+        global globalA, globalB
+        commands = [
+            (2.34, incrementA),
+            (1.23, incrementB),
+        ]
+        self.assertTrue(revl.validate(commands))
+
+        samplings = (revl.Sampling.LINEAR, revl.Sampling.BISECT,
+                     revl.Sampling.ALIAS, revl.Sampling.NUMPY)
+        for sampling in samplings:
+            values = []
+            for _ in range(2):
+                globalA = 0
+                globalB = 0
+                context = revl.run(commands, 123, seed=1.23, sampling=sampling)
+                self.assertIsInstance(context, revl.Context)
+                self.assertEqual(globalA + globalB, 123)
+                values.append((globalA, globalB))
+
+            self.assertEqual(values[0], values[1])
+
+    def testRun9(self):
+        commands = [
+            (1.0, incrementA),
+            (1.0, revl.createPrimitive, (), {'parent': True}),
+        ]
+        self.assertTrue(revl.validate(commands))
+
+        random.seed(1.23)
+        expected = random.random()
+
+        random.seed(1.23)
+        revl.run(commands, 123, seed=4.56)
+        self.assertEqual(random.random(), expected)
+
+    def testRun10(self):
+        commands = [
+            (1.0, incrementA),
+            (1.0, incrementB),
+        ]
+        self.assertTrue(revl.validate(commands))
+
+        generator = random.Random()
+        context = revl.Context(random=generator)
+        self.assertIs(revl.run(commands, 123, seed=1.23, context=context).random, generator)
+
+    def testRun11(self):
+        commands = [
+            (1.0, revl.createTransform, (), {'parent': True}),
+            (1.0, revl.createPrimitive, (), {'parent': True}),
+        ]
+        self.assertTrue(revl.validate(commands))
+
+        context = revl.run(commands, 123, seed=1.23, flushEvery=10)
+        self.assertEqual(len(context.transforms), 123)
+
+        dagPath = OpenMaya.MDagPath()
+        for oTransform in context.transforms:
+            OpenMaya.MDagPath.getAPathTo(oTransform, dagPath)
+            self.assertTrue(dagPath.length() > 0)
+
+    def testFlush(self):
+        context = revl.Context()
+        dg = context.dg
+        dag = context.dag
+
+        oTransform = revl.createTransform(context)
+        context.flush()
+        self.assertIsNot(context.dg, dg)
+        self.assertIsNot(context.dag, dag)
+
+        oChild = revl.createTransform(context)
+        context.dag.reparentNode(oChild, oTransform)
+        context.flush()
+
+        dagPath = OpenMaya.MDagPath()
+        OpenMaya.MDagPath.getAPathTo(oChild, dagPath)
+        self.assertEqual(dagPath.length(), 2)
+
+    def testCompile(self):
+        calls = []
+
+        def record(context, *args, **kwargs):
+            calls.append((context, args, kwargs))
+
+        commands = [
+            revl.Command(1.0, record),
+            revl.Command(1.0, record, (), {}),
+            revl.Command(1.0, record, (1, 2)),
+            revl.Command(1.0, record, [1, 2], None),
+            revl.Command(1.0, record, None, {'a': 1}),
+            revl.Command(1.0, record, (1, 2), {'a': 1}),
+        ]
+        for function in revl._compile(commands):
+            function('context')
+
+        self.assertEqual(calls, [
+            ('context', (), {}),
+            ('context', (), {}),
+            ('context', (1, 2), {}),
+            ('context', (1, 2), {}),
+            ('context', (), {'a': 1}),
+            ('context', (1, 2), {'a': 1}),
+        ])
+
+    def testPick(self):
+        weights = (1.0, 0.0, 3.0, 2.0, 4.0)
+        commands = [revl.Command(weight, incrementA) for weight in weights]
+        total = sum(weights)
+        count = 100000
+        samplings = (revl.Sampling.LINEAR, revl.Sampling.BISECT,
+                     revl.Sampling.ALIAS, revl.Sampling.NUMPY)
+        for sampling in samplings:
+            counts = [0] * len(commands)
+            generator = random.Random(1.23)
+            for command in revl._pick(commands, count, generator,
+                                      sampling=sampling):
+                counts[commands.index(command)] += 1
+
+            self.assertEqual(sum(counts), count)
+            for weight, value in zip(weights, counts):
+                self.assertAlmostEqual(float(value) / count, weight / total,
+                                       delta=0.01)
+
+    def testPlan(self):
+        commands = [
+            (2.34, incrementA),
+            (0.0, incrementB),
+            (1.23, incrementB),
+        ]
+        self.assertTrue(revl.validate(commands))
+
+        schedule = revl.plan(commands, 123, seed=1.23, draws=3)
+        self.assertIsInstance(schedule, revl.Schedule)
+        self.assertEqual(len(schedule.indices), 123)
+        self.assertEqual(len(schedule.values), 369)
+        self.assertTrue(all(i in (0, 2) for i in schedule.indices))
+        self.assertTrue(all(0.0 <= v < 1.0 for v in schedule.values))
+
+        other = revl.plan(commands, 123, seed=1.23, draws=3)
+        self.assertEqual(list(schedule.indices), list(other.indices))
+        self.assertEqual(list(schedule.values), list(other.values))
+
+    def testExecute(self):
+        global globalA, globalB
+        commands = [
+            (2.34, incrementA),
+            (1.23, incrementB),
+            (1.0, revl.createPrimitive, (), {'parent': True}),
+        ]
+        self.assertTrue(revl.validate(commands))
+
+        schedule = revl.plan(commands, 123, seed=1.23)
+        values = []
+        for _ in range(2):
+            globalA = 0
+            globalB = 0
+            OpenMaya.MFileIO.newFile(True)
+            context = revl.execute(schedule, commands)
+            self.assertIsInstance(context, revl.Context)
+            self.assertEqual(len(context.transforms),
+                             list(schedule.indices).count(2))
+            values.append((globalA, globalB))
+
+        self.assertEqual(values[0], values[1])
+        self.assertEqual(sum(values[0]),
+                         123 - len(context.transforms))
+
     def testErrorMessages(self):
         def dummy(context):
             pass
@@ -251,6 +476,13 @@ class MainTest(unittest.TestCase):
         self.assertTrue(revl.createDgNode(context, 'clamp').hasFn(OpenMaya.MFn.kClampColor))
         self.assertTrue(revl.createDgNode(context, 'lambert').hasFn(OpenMaya.MFn.kLambert))
 
+    def testCreateDgNodes(self):
+        context = revl.Context(trackNodes=True)
+        oNodes = revl.createDgNodes(context, 'lambert', 3)
+        self.assertEqual(len(oNodes), 3)
+        self.assertTrue(all(oNode.hasFn(OpenMaya.MFn.kLambert) for oNode in oNodes))
+        self.assertEqual(context.nodes.count('lambert'), 3)
+
     def testCreatePrimitive1(self):
         context = revl.Context()
         primitive = revl.createPrimitive(context)
@@ -536,6 +768,53 @@ class MainTest(unittest.TestCase):
         self.assertTrue(all(shape.hasFn(OpenMaya.MFn.kGeometric) for shape in primitive.shapes))
         self.assertEqual(len(context.transforms), 1)
 
+    def testCreatePrimitive6(self):
+        context = revl.Context()
+        primitives = []
+        for type in range(revl.PrimitiveType._FIRST, revl.PrimitiveType._LAST + 1):
+            for _ in range(2):
+                primitives.append((type, revl.createPrimitive(context, type)))
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        for type, primitive in primitives:
+            traits = revl._PRIMITIVE_TRAITS[type]
+            generator = OpenMaya.MFnDependencyNode(primitive.generator)
+            self.assertEqual(len(primitive.shapes), len(traits.outPlugs))
+            for outPlug, oShape in zip(traits.outPlugs, primitive.shapes):
+                plugs = OpenMaya.MPlugArray()
+                generator.findPlug(outPlug).connectedTo(plugs, False, True)
+                self.assertEqual(plugs.length(), 1)
+                self.assertEqual(plugs[0].node(), oShape)
+                self.assertEqual(OpenMaya.MFnAttribute(plugs[0].attribute()).name(), traits.inPlug)
+
+    def testCreatePrimitives(self):
+        context = revl.Context()
+        primitives = revl.createPrimitives(context, 3, type=revl.PrimitiveType.POLY_CUBE, name='cube')
+        self.assertEqual(len(primitives), 3)
+        self.assertEqual(len(context.transforms), 3)
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        for primitive in primitives:
+            self.assertTrue(primitive.generator.hasFn(OpenMaya.MFn.kPolyPrimitive))
+            self.assertTrue(OpenMaya.MFnTransform(primitive.transform).name().startswith('cube'))
+
+    def testCreatePrimitive7(self):
+        context = revl.Context()
+        primitives = revl.createPrimitives(context, 3, type=revl.PrimitiveType.POLY_CUBE, shareGenerator=True)
+        self.assertTrue(all(primitive.generator is primitives[0].generator for primitive in primitives))
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        plugs = OpenMaya.MPlugArray()
+        generator = OpenMaya.MFnDependencyNode(primitives[0].generator)
+        generator.findPlug('output').connectedTo(plugs, False, True)
+        self.assertEqual(plugs.length(), 3)
+
     def testCreateTransform(self):
         context = revl.Context()
         oTransforms = []
@@ -568,6 +847,37 @@ class MainTest(unittest.TestCase):
 
             self.assertEqual(dagPath.length(), depth)
 
+    def testPickNode(self):
+        context = revl.Context(trackNodes=True)
+        self.assertEqual(revl.pickNode(context, 'mesh'), revl.NULL_OBJ)
+
+        primitive = revl.createPrimitive(context, type=revl.PrimitiveType.POLY_CUBE)
+        oLambert = revl.createDgNode(context, 'lambert')
+        self.assertEqual(revl.pickNode(context, 'mesh'), primitive.shapes[0])
+        self.assertEqual(revl.pickNode(context, 'polyCube'), primitive.generator)
+        self.assertEqual(revl.pickNode(context, 'transform'), primitive.transform)
+        self.assertEqual(revl.pickNode(context, 'lambert'), oLambert)
+        self.assertEqual(len(context.nodes), 4)
+
+    def testCreateTransforms(self):
+        context = revl.Context()
+        oRoots = revl.createTransforms(context, 2, name='root')
+        oChildren = revl.createTransforms(context, 3, parent=True)
+        self.assertEqual(context.transforms, oRoots + oChildren)
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        dagPath = OpenMaya.MDagPath()
+        for oTransform in oRoots:
+            OpenMaya.MDagPath.getAPathTo(oTransform, dagPath)
+            self.assertTrue(OpenMaya.MFnTransform(oTransform).name().startswith('root'))
+            self.assertEqual(dagPath.length(), 1)
+
+        for oTransform in oChildren:
+            OpenMaya.MDagPath.getAPathTo(oTransform, dagPath)
+            self.assertTrue(dagPath.length() > 1)
+
     def testUnparent1(self):
         context = revl.Context()
 
@@ -592,6 +902,45 @@ class MainTest(unittest.TestCase):
         context.dag.doIt()
         context.dg.doIt()
 
+    def testReparent1(self):
+        context = revl.Context(trackNodes=True)
+
+        revl.createTransform(context)
+        revl.createTransform(context)
+        hierarchy = context.hierarchy
+        context.random.seed(1.23)
+        for _ in range(100):
+            revl.reparent(context)
+            if max(hierarchy.parents) >= 0:
+                break
+
+        # Either transform can end up under the other one.
+        parents = list(hierarchy.parents)
+        self.assertIn(parents, ([-1, 0], [1, -1]))
+        child = 1 if parents[1] >= 0 else 0
+        oChild = hierarchy.nodes[child]
+        oParent = hierarchy.nodes[parents[child]]
+
+        context.dag.doIt()
+        context.dg.doIt()
+
+        dagPath = OpenMaya.MDagPath()
+        OpenMaya.MDagPath.getAPathTo(oChild, dagPath)
+        self.assertEqual(dagPath.length(), 2)
+        self.assertEqual(OpenMaya.MFnDagNode(oChild).parent(0), oParent)
+        OpenMaya.MDagPath.getAPathTo(oParent, dagPath)
+        self.assertEqual(dagPath.length(), 1)
+
+    def testReparent2(self):
+        context = revl.Context(trackNodes=True)
+
+        revl.reparent(context)
+        revl.createTransform(context)
+        revl.reparent(context)
+
+        context.dag.doIt()
+        context.dg.doIt()
+
     def testCustomCommand(self):
         def createTemplatedPrimitive(context, type=None, name=None,
                                      parent=False):